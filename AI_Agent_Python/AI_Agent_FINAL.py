@@ -1,5 +1,8 @@
 import os
+import sys
 import json
+import resource
+import threading
 from datetime import datetime
 import time
 import asyncio
@@ -10,6 +13,10 @@ import google.generativeai as genai
 from pydantic import BaseModel # Für Agenten-Input-Modell, falls das ADK verwendet wird
 #from google import genai
 #from google.genai import types
+from dom_snapshot import capture_dom_snapshot
+from token_budget import (
+    CHARS_PER_TOKEN, TokenBudget, count_tokens, reduce_html, split_html,
+)
 
 
 # --- Konfiguration ---
@@ -26,6 +33,16 @@ OUTPUT_REPORT_FILE = f"wcag_analysis_report_{datetime.now().strftime('%Y%m%d_%H%
 BASE_URL = "https://www.otto.de"
 SEARCH_URL_TSHIRT = f"{BASE_URL}/suche/t-shirt"
 
+# Erfassung des Seiten-HTML: "content" = page.content() (kompletter HTML-String),
+# "snapshot" = CDP DOMSnapshot als Knotentabelle auf der Platte (speicherschonend, ohne Skripte/Styles)
+CAPTURE_MODE = os.getenv("CAPTURE_MODE", "content")
+
+# Budgets für die Gemini-Analyse (Prompt-Tokens pro Schritt, Tokens und Sekunden pro Lauf)
+MAX_TOKENS_PER_STEP = int(os.getenv("MAX_TOKENS_PER_STEP", "200000"))
+MAX_TOKENS_PER_RUN = int(os.getenv("MAX_TOKENS_PER_RUN", "1000000"))
+MAX_SECONDS_PER_RUN = float(os.getenv("MAX_SECONDS_PER_RUN", "1800"))
+RUN_BUDGET = TokenBudget(MAX_TOKENS_PER_STEP, MAX_TOKENS_PER_RUN, MAX_SECONDS_PER_RUN)
+
 SELECTORS = {
     "search_result_item_selector": 'article[data-id="S0O1G0UY"]',
     #size-input-4
@@ -61,10 +78,8 @@ WCAG 2.2 Level A und AA Kriterien, insbesondere fokussiert auf semantische und k
 
 interaction_history = []
 
-# --- Funktion zur WCAG-Analyse mit Gemini ---
-async def analyze_with_gemini(page_html: str, current_url: str, step_description: str, full_interaction_history: list) -> dict:
-    # ... (Dieser Teil des Codes ist bereits asynchron und benötigt keine Änderungen hier) ...
-    
+# --- Prompt für die WCAG-Analyse ---
+def build_prompt(page_html: str, current_url: str, step_description: str, full_interaction_history: list) -> str:
     # Baue den Kontext-String aus der Historie
     history_context_str = ""
     if full_interaction_history:
@@ -136,37 +151,101 @@ async def analyze_with_gemini(page_html: str, current_url: str, step_description
     ```
  
     """
-    
+    return prompt_text
+
+
+# --- Gemini-Antwort als JSON lesen ---
+def parse_json_response(json_response_text: str) -> list:
+    try:
+        # Versuche, den erhaltenen String in JSON zu parsen
+        return json.loads(json_response_text)
+    except json.JSONDecodeError:
+        # ... (Logik zur Bereinigung und erneutem Parsen, falls Gemini kein sauberes JSON liefert) ...
+        print(f"WARNUNG: Gemini hat kein gültiges JSON geliefert. Rohantwort: {json_response_text[:200]}...")
+        clean_response_text = json_response_text.strip()
+        if clean_response_text.startswith("```json") and clean_response_text.endswith("```"):
+            clean_response_text = clean_response_text[len("```json"): -len("```")].strip()
+        # Fangen Sie auch einen möglichen Fehler hier ab, falls clean_response_text immer noch kein gültiges JSON ist
+        try:
+            return json.loads(clean_response_text)
+        except json.JSONDecodeError as e_clean:
+            print(f"FEHLER: Bereinigte Antwort ist immer noch kein gültiges JSON: {e_clean}")
+            print(f"Fehlerhafte bereinigte Antwort: {clean_response_text[:500]}...")
+            return [] # Gib leere Liste im Fehlerfall zurück
+
+
+# --- Funktion zur WCAG-Analyse mit Gemini ---
+async def analyze_with_gemini(page_html: str, current_url: str, step_description: str, full_interaction_history: list) -> dict:
+    # Pre-flight: Prompt-Größe bestimmen und gegen das Budget prüfen
+    prompt_text = build_prompt(page_html, current_url, step_description, full_interaction_history)
+    prompt_tokens = await count_tokens(GEMINI_MODEL, prompt_text)
+    strategy = "vollständig"
+
+    if not RUN_BUDGET.fits_step(prompt_tokens):
+        print(f"Prompt für {step_description} hat {prompt_tokens} Tokens (Limit {RUN_BUDGET.max_tokens_per_step}), reduziere HTML...")
+        page_html = reduce_html(page_html)
+        prompt_text = build_prompt(page_html, current_url, step_description, full_interaction_history)
+        prompt_tokens = await count_tokens(GEMINI_MODEL, prompt_text)
+        strategy = "reduziert"
+
+    if not RUN_BUDGET.fits_step(prompt_tokens):
+        # Immer noch zu groß: HTML in Teile zerlegen, die jeweils ins Schritt-Budget passen.
+        # Zeichen pro Token aus der gemessenen Zählung ableiten, dichtes HTML hat weniger als 4
+        chars_per_token = min(CHARS_PER_TOKEN, len(prompt_text) / max(prompt_tokens, 1))
+        overhead_chars = len(build_prompt("", current_url, f"{step_description} (Teil 999/999)", full_interaction_history))
+        max_chars = int((RUN_BUDGET.max_tokens_per_step * chars_per_token - overhead_chars) * 0.95)
+        min_chars = 1000 * CHARS_PER_TOKEN
+        # Jeden Teil mit count_tokens prüfen und bei Überschreitung kleiner schneiden
+        for _ in range(3):
+            chunks = split_html(page_html, max(min_chars, max_chars))
+            chunk_prompts = [
+                build_prompt(chunk, current_url, f"{step_description} (Teil {i+1}/{len(chunks)})", full_interaction_history)
+                for i, chunk in enumerate(chunks)
+            ]
+            chunk_tokens = [await count_tokens(GEMINI_MODEL, chunk_prompt) for chunk_prompt in chunk_prompts]
+            largest = max(chunk_tokens)
+            if RUN_BUDGET.fits_step(largest) or max_chars <= min_chars:
+                break
+            max_chars = int(max_chars * RUN_BUDGET.max_tokens_per_step / largest * 0.95)
+        if not RUN_BUDGET.fits_step(largest):
+            print(f"WARNUNG: Teil-Prompts für {step_description} haben bis zu {largest} Tokens (Limit {RUN_BUDGET.max_tokens_per_step}).")
+        print(f"Prompt für {step_description} ist weiterhin zu groß, analysiere in {len(chunks)} Teilen...")
+        all_results = []
+        for chunk_prompt, tokens in zip(chunk_prompts, chunk_tokens):
+            chunk_results = await _analyze_prompt(chunk_prompt, step_description, tokens, "gechunkt")
+            if isinstance(chunk_results, list):
+                all_results.extend(chunk_results)
+            elif chunk_results:
+                all_results.append(chunk_results)
+        return all_results
+
+    return await _analyze_prompt(prompt_text, step_description, prompt_tokens, strategy)
+
+
+async def _analyze_prompt(prompt_text: str, step_description: str, prompt_tokens: int, strategy: str):
+    if not RUN_BUDGET.allows(prompt_tokens):
+        print(f"WARNUNG: Lauf-Budget erschöpft, überspringe Analyse für {step_description} ({prompt_tokens} Tokens).")
+        RUN_BUDGET.skip(step_description, prompt_tokens)
+        return []
+
+    started = time.perf_counter()
     try:
         print(GOOGLE_API_KEY)
-        print(f"Sende Anfrage an Gemini für {step_description}...")
+        print(f"Sende Anfrage an Gemini für {step_description} ({prompt_tokens} Tokens, {strategy})...")
         response = await GEMINI_MODEL.generate_content_async(
             contents=[prompt_text],
             generation_config={"response_mime_type": "application/json", "temperature": 0.1}
         )
+        usage = getattr(response, "usage_metadata", None)
+        RUN_BUDGET.record(
+            step_description,
+            getattr(usage, "prompt_token_count", None) or prompt_tokens,
+            getattr(usage, "candidates_token_count", None) or 0,
+            time.perf_counter() - started,
+            strategy,
+        )
 
-        json_response_text = response.text 
-
-
-        try:
-            # Versuche, den erhaltenen String in JSON zu parsen
-            parsed_response = json.loads(json_response_text)
-        except json.JSONDecodeError:
-            # ... (Logik zur Bereinigung und erneutem Parsen, falls Gemini kein sauberes JSON liefert) ...
-            print(f"WARNUNG: Gemini hat kein gültiges JSON geliefert. Rohantwort: {json_response_text[:200]}...")
-            clean_response_text = json_response_text.strip()
-            if clean_response_text.startswith("```json") and clean_response_text.endswith("```"):
-                clean_response_text = clean_response_text[len("```json"): -len("```")].strip()
-            # Fangen Sie auch einen möglichen Fehler hier ab, falls clean_response_text immer noch kein gültiges JSON ist
-            try:
-                parsed_response = json.loads(clean_response_text)
-            except json.JSONDecodeError as e_clean:
-                print(f"FEHLER: Bereinigte Antwort ist immer noch kein gültiges JSON: {e_clean}")
-                print(f"Fehlerhafte bereinigte Antwort: {clean_response_text[:500]}...")
-                return [] # Gib leere Liste im Fehlerfall zurück
-
-
-        return parsed_response
+        return parse_json_response(response.text)
 
     except Exception as e:
         print(f"FEHLER bei Gemini-Analyse für '{step_description}': {e}")
@@ -193,9 +272,88 @@ async def perform_accessibility_analysis_on_page(page, axe_options=None):
     # Let's just return HTML content for direct passing to Gemini
     return await page.content() # Just return HTML for now to avoid axe_playwright issues
 
+# --- Erfassung des Seiten-HTML (page.content() oder CDP DOMSnapshot) ---
+async def capture_page_html(page) -> str:
+    """
+    Liefert das HTML der aktuellen Seite für die Analyse, je nach CAPTURE_MODE.
+    Im Snapshot-Modus wird nie der komplette HTML-String der Seite erzeugt, sondern nur
+    das reduzierte HTML aus der speicherabgebildeten Knotentabelle. Dieses wird einmal
+    als String zusammengesetzt, weil Gemini den Prompt als einen String erwartet.
+    """
+    if CAPTURE_MODE == "snapshot":
+        snapshot = await capture_dom_snapshot(page)
+        try:
+            return snapshot.reduced_html()
+        finally:
+            snapshot.close()
+    return await page.content()
+
+
+def current_rss_mb() -> float:
+    """Aktuelle Resident Set Size des Prozesses in MB (Linux: /proc, sonst Peak aus getrusage)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS liefert Bytes, Linux KB
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class PeakRssMonitor:
+    """
+    Misst den RSS-Peak einer einzelnen Journey. ru_maxrss gilt für den ganzen Prozess
+    und sinkt nie; deshalb tastet ein Hintergrund-Thread die aktuelle RSS ab, solange
+    die Journey läuft (auch während die Event-Loop durch CPU-Arbeit blockiert ist).
+    """
+
+    def __init__(self, interval_seconds: float = 0.05):
+        self.interval_seconds = interval_seconds
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self.stop()
+        self.peak_mb = current_rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+    def stop(self) -> float:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return round(self.peak_mb, 1)
+
+
+JOURNEY_RSS = PeakRssMonitor()
+
+
+def memory_info(page_html: str) -> dict:
+    return {
+        "capture_modus": CAPTURE_MODE,
+        "html_zeichen": len(page_html),
+        "journey_peak_rss_mb": round(max(JOURNEY_RSS.peak_mb, current_rss_mb()), 1),
+    }
+
+
 # --- Haupt-Simulations-Workflow ---
-async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
+async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict, raise_errors: bool = False):
+    """
+    Führt die Shopping-Journey aus und analysiert jede Seite.
+    Bei raise_errors=True wird ein Abbruch weitergereicht statt die bis dahin
+    gesammelten Schritte zurückzugeben (der verteilte Worker stellt den Job dann zurück).
+    """
     all_analysis_results = []
+    JOURNEY_RSS.start()
     
     # <--- WICHTIG: async with statt nur with ---
     async with async_playwright() as p:
@@ -231,8 +389,7 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
 
 
             current_url = page.url
-            # <--- WICHTIG: await vor page.content ---
-            current_html = await page.content()
+            current_html = await capture_page_html(page)
             
             print(f"Analysiere Suchergebnisseite: {current_url}")
             step_results = await analyze_with_gemini(current_html, current_url, "Suchergebnisseite", interaction_history)
@@ -240,7 +397,9 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
                 "step": 1,
                 "description": "Suchergebnisseite",
                 "url": current_url,
-                "violations": step_results
+                "violations": step_results,
+                "speicher": memory_info(current_html),
+                "budget": RUN_BUDGET.usage_for("Suchergebnisseite")
             })
             interaction_history.append({"url": current_url, "action": "Navigiert zu Suchergebnis"})
        
@@ -259,8 +418,7 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
                 
                 # --- Webseite 2: Produktdetailseite (nach Klick auf Artikel) ---
                 current_url = page.url
-                # <--- WICHTIG: await vor page.content ---
-                current_html = await page.content()
+                current_html = await capture_page_html(page)
 
                 print(f"\n--- Schritt 2: Produktdetailseite (nach Klick auf Artikel) ---")
                
@@ -291,7 +449,9 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
                     "step": 2,
                     "description": "Produktdetailseite",
                     "url": current_url,
-                    "violations": step_results
+                    "violations": step_results,
+                    "speicher": memory_info(current_html),
+                    "budget": RUN_BUDGET.usage_for("Produktdetailseite")
                 })
                 interaction_history.append({"url": current_url, "action": "Artikel aus Suchergebnis gewählt"})
 
@@ -319,8 +479,7 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
                         await page.wait_for_load_state("networkidle")
                         
                         current_url = page.url
-                        # <--- WICHTIG: await vor page.content ---
-                        current_html = await page.content()
+                        current_html = await capture_page_html(page)
 
                         print(f"\n--- Schritt 3: Warenkorb-Seite ---")
                         print(f"Analysiere Warenkorbseite: {current_url}")
@@ -329,7 +488,9 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
                             "step": 3,
                             "description": "Warenkorbseite",
                             "url": current_url,
-                            "violations": step_results
+                            "violations": step_results,
+                            "speicher": memory_info(current_html),
+                            "budget": RUN_BUDGET.usage_for("Warenkorbseite (nach Artikel-Hinzufügung)")
                         })
                         interaction_history.append({"url": current_url, "action": "Artikel in Warenkorb gelegt und zum Warenkorb navigiert"})
 
@@ -344,10 +505,13 @@ async def run_shopping_workflow_and_analyze(search_url: str, selectors: dict):
             print(f"Ein schwerwiegender Fehler ist aufgetreten: {e}")
             # <--- WICHTIG: await vor page.screenshot ---
             await page.screenshot(path=f"error_workflow_{datetime.now().strftime('%H%M%S')}.png")
+            if raise_errors:
+                raise
         finally:
             if browser:
                 # <--- WICHTIG: await vor browser.close ---
                 await browser.close()
+            print(f"Peak-RSS der Journey (Erfassung '{CAPTURE_MODE}'): {JOURNEY_RSS.stop()} MB")
 
     return all_analysis_results
 
@@ -361,8 +525,16 @@ if __name__ == "__main__":
     final_report = asyncio.run(run_shopping_workflow_and_analyze(SEARCH_URL_TSHIRT, SELECTORS))
 
     if final_report:
+        skipped_steps = RUN_BUDGET.skipped_steps()
         with open(OUTPUT_REPORT_FILE, "w", encoding="utf-8") as f:
-            json.dump(final_report, f, indent=4, ensure_ascii=False)
+            json.dump({
+                "schritte": final_report,
+                "budget": RUN_BUDGET.summary(),
+                "uebersprungene_schritte": skipped_steps,
+            }, f, indent=4, ensure_ascii=False)
         print(f"\n--- Gesamter WCAG-Analysebericht für den Workflow in '{OUTPUT_REPORT_FILE}' gespeichert. ---")
+        print(f"Budget-Verbrauch des Laufs: {RUN_BUDGET.summary()}")
+        if skipped_steps:
+            print(f"WARNUNG: Wegen erschöpftem Budget nicht (vollständig) analysiert: {skipped_steps}")
     else:
         print("\n--- Workflow-Analyse konnte nicht erfolgreich abgeschlossen werden. ---")
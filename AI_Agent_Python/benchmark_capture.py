@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import argparse
+import tempfile
+import tracemalloc
+
+from dom_snapshot import DomSnapshot, write_snapshot
+
+# --- Vergleich der beiden Erfassungswege (CAPTURE_MODE) ohne Browser ---
+# Eine synthetische Shop-Seite (Produktkacheln + große Inline-Skripte/JSON, wie bei
+# otto.de) wird einmal als HTML-String (so liefert ihn page.content()) und einmal als
+# DOMSnapshot-Antwort im CDP-Format erzeugt. Gemessen wird der Python-Heap-Peak
+# (tracemalloc) vom Empfang der Antwort bis zum fertigen Prompt-String.
+#
+# Aufruf:
+#   python benchmark_capture.py --products 2000 --script-kb 4000
+
+PROMPT_OVERHEAD = "x" * 4000  # Anweisungen von build_prompt(), ohne Seite
+# Entspricht SKIPPED_ELEMENTS in dom_snapshot
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>", re.S | re.I)
+
+
+def synthetic_page(products: int, script_kb: int):
+    """Liefert (html, raw) für dieselbe Seite: HTML-String und DOMSnapshot-Antwort."""
+    strings, index = [], {}
+    nodes = {"parentIndex": [], "nodeType": [], "nodeName": [], "nodeValue": [], "attributes": []}
+    html = []
+
+    def s(value):
+        if value not in index:
+            index[value] = len(strings)
+            strings.append(value)
+        return index[value]
+
+    def add(parent, node_type, name, value=None, attrs=()):
+        nodes["parentIndex"].append(parent)
+        nodes["nodeType"].append(node_type)
+        nodes["nodeName"].append(s(name))
+        nodes["nodeValue"].append(s(value) if value is not None else -1)
+        nodes["attributes"].append([s(part) for pair in attrs for part in pair])
+        return len(nodes["parentIndex"]) - 1
+
+    document = add(-1, 9, "#document")
+    root = add(document, 1, "HTML", attrs=[("lang", "de")])
+    head = add(root, 1, "HEAD")
+    body = add(root, 1, "BODY")
+    html.append('<!DOCTYPE html><html lang="de"><head>')
+    # Inline-Skripte mit Zustands-JSON, in 64-KB-Blöcken
+    for i in range(max(1, script_kb // 64)):
+        code = f"window.__STATE_{i}__ = " + json.dumps({"daten": "a" * 64 * 1024})
+        add(add(head, 1, "SCRIPT"), 3, "#text", code)
+        html.append(f"<script>{code}</script>")
+    html.append("</head><body>")
+    for i in range(products):
+        attrs = [("class", "product-tile"), ("data-id", f"P{i:07d}")]
+        article = add(body, 1, "ARTICLE", attrs=attrs)
+        link = add(article, 1, "A", attrs=[("href", f"/p/artikel-{i}/")])
+        add(link, 1, "IMG", attrs=[("src", f"/img/{i}.jpg"), ("alt", f"Artikel {i}")])
+        add(add(link, 1, "SPAN"), 3, "#text", f"T-Shirt Modell {i}")
+        add(add(article, 1, "DIV", attrs=[("class", "price")]), 3, "#text", f"{i % 90 + 9},99 €")
+        html.append(
+            f'<article class="product-tile" data-id="P{i:07d}"><a href="/p/artikel-{i}/">'
+            f'<img src="/img/{i}.jpg" alt="Artikel {i}"><span>T-Shirt Modell {i}</span></a>'
+            f'<div class="price">{i % 90 + 9},99 €</div></article>'
+        )
+    html.append("</body></html>")
+    return "".join(html), {"documents": [{"nodes": nodes}], "strings": strings}
+
+
+def measure(run) -> dict:
+    tracemalloc.start()
+    prompt_chars = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_mb": round(peak / (1024 * 1024), 1), "prompt_zeichen": prompt_chars}
+
+
+def content_path(html_json: str) -> int:
+    # page.content(): Playwright deserialisiert die Antwort zu einem kompletten String;
+    # danach dieselbe Reduktion wie im Snapshot-Weg (ohne Skripte/Styles), damit beide
+    # Wege denselben Prompt liefern und nur die Erfassung verglichen wird
+    page_html = _SCRIPT_STYLE_RE.sub("", json.loads(html_json))
+    prompt = f"{PROMPT_OVERHEAD}{page_html}"
+    return len(prompt)
+
+
+def snapshot_path(raw_json: str, snapshot_dir: str) -> int:
+    # capture_dom_snapshot(): CDP-Antwort -> Datei -> mmap -> reduziertes HTML
+    raw = json.loads(raw_json)
+    fd, path = tempfile.mkstemp(suffix=".bin", dir=snapshot_dir)
+    with os.fdopen(fd, "wb") as f:
+        write_snapshot(raw, f)
+    del raw
+    with DomSnapshot(path) as snapshot:
+        page_html = snapshot.reduced_html()
+    prompt = f"{PROMPT_OVERHEAD}{page_html}"
+    return len(prompt)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Speichervergleich page.content() vs. DOMSnapshot")
+    arg_parser.add_argument("--products", type=int, default=2000)
+    arg_parser.add_argument("--script-kb", type=int, default=4000, help="Umfang der Inline-Skripte")
+    args = arg_parser.parse_args()
+
+    page_html, raw = synthetic_page(args.products, args.script_kb)
+    # Als JSON wie über die CDP-Verbindung, damit beide Wege ab dem Empfang gemessen werden
+    html_json, raw_json = json.dumps(page_html), json.dumps(raw)
+    del page_html, raw
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        results = {
+            "antwort_mb": {
+                "content": round(len(html_json) / (1024 * 1024), 1),
+                "snapshot": round(len(raw_json) / (1024 * 1024), 1),
+            },
+            "content": measure(lambda: content_path(html_json)),
+            "snapshot": measure(lambda: snapshot_path(raw_json, snapshot_dir)),
+        }
+    print(json.dumps(results, indent=4, ensure_ascii=False))
@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from datetime import datetime
+
+from job_queue import open_queue
+from token_budget import TokenBudget
+
+# --- Verteilter Worker-Modus ---
+# Der Koordinator legt die Journeys in einer dauerhaften Queue ab, startet lokale
+# Worker-Prozesse (weitere Hosts starten "worker" gegen dieselbe Queue) und führt
+# am Ende alle Ergebnisse in einem Bericht zusammen. Jeder Worker-Prozess hat eine
+# eigene Event-Loop und einen eigenen Browser, damit Playwright, HTML-Verarbeitung
+# und JSON-Handling auf mehrere Kerne verteilt werden.
+#
+# Beispiel:
+#   python distributed_worker.py coordinator --queue jobs.db --workers 4 --journeys journeys.json
+#   python distributed_worker.py worker --queue redis://queue-host:6379/0
+
+LEASE_SECONDS = 120
+HEARTBEAT_SECONDS = 30
+POLL_SECONDS = 2
+
+
+class BudgetExhaustedError(RuntimeError):
+    """Analysen wurden wegen erschöpftem Token-/Zeitbudget übersprungen; ein neuer Versuch zahlt nur erneut."""
+
+
+async def _heartbeat(queue, job_id: int, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        if not queue.heartbeat(job_id, worker_id, LEASE_SECONDS):
+            print(f"[{worker_id}] Lease für Job {job_id} verloren.")
+            return
+
+
+async def _run_job(queue, job_id: int, payload: dict, worker_id: str):
+    # Import erst im Worker-Prozess: AI_Agent_FINAL konfiguriert beim Import das Gemini-SDK
+    import AI_Agent_FINAL
+
+    # Interaktionspfad und Budget sind global im Agenten und dürfen nicht zwischen Journeys geteilt werden
+    AI_Agent_FINAL.interaction_history.clear()
+    AI_Agent_FINAL.RUN_BUDGET = TokenBudget(
+        AI_Agent_FINAL.MAX_TOKENS_PER_STEP, AI_Agent_FINAL.MAX_TOKENS_PER_RUN, AI_Agent_FINAL.MAX_SECONDS_PER_RUN
+    )
+    heartbeat = asyncio.create_task(_heartbeat(queue, job_id, worker_id))
+    try:
+        steps = await AI_Agent_FINAL.run_shopping_workflow_and_analyze(
+            payload["search_url"], payload.get("selectors") or AI_Agent_FINAL.SELECTORS, raise_errors=True
+        )
+    finally:
+        heartbeat.cancel()
+
+    skipped_steps = AI_Agent_FINAL.RUN_BUDGET.skipped_steps()
+    if skipped_steps:
+        raise BudgetExhaustedError(f"Analyse wegen erschöpftem Budget übersprungen: {skipped_steps}")
+    return {"steps": steps, "budget": AI_Agent_FINAL.RUN_BUDGET.summary()}
+
+
+def run_worker(queue_location: str, worker_id: str = None, exit_when_drained: bool = True) -> None:
+    """
+    Holt Journeys aus der Queue und führt sie nacheinander aus, bis die Queue leer ist.
+
+    Args:
+        queue_location (str): Pfad der SQLite-Datei oder redis://-URL.
+        worker_id (str): Eindeutige Kennung des Workers (Standard: Host und PID).
+        exit_when_drained (bool): Beenden, sobald keine offenen oder geleasten Jobs mehr existieren.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = open_queue(queue_location)
+    print(f"[{worker_id}] Worker gestartet.")
+
+    while True:
+        leased = queue.lease(worker_id, LEASE_SECONDS)
+        if leased is None:
+            if exit_when_drained and queue.is_drained():
+                break
+            # Andere Worker halten noch Leases, die nach einem Absturz wieder frei werden können
+            time.sleep(POLL_SECONDS)
+            continue
+
+        job_id, payload = leased
+        print(f"[{worker_id}] Bearbeite Job {job_id}: {payload['search_url']}")
+        started = time.perf_counter()
+        try:
+            result = asyncio.run(_run_job(queue, job_id, payload, worker_id))
+        except BudgetExhaustedError as e:
+            # Ein neuer Versuch liefe mit demselben Budget wieder in dieselbe Grenze
+            print(f"[{worker_id}] Job {job_id} endgültig abgebrochen: {e}")
+            queue.fail(job_id, worker_id, str(e), retry=False)
+            continue
+        except Exception as e:
+            print(f"[{worker_id}] FEHLER in Job {job_id}: {e}")
+            queue.fail(job_id, worker_id, str(e))
+            continue
+        if not result["steps"]:
+            queue.fail(job_id, worker_id, "Workflow lieferte kein Ergebnis")
+            continue
+        completed = queue.complete(job_id, worker_id, {
+            "worker": worker_id,
+            "dauer_s": round(time.perf_counter() - started, 2),
+            "steps": result["steps"],
+            "budget": result["budget"],
+        })
+        if completed:
+            print(f"[{worker_id}] Job {job_id} abgeschlossen.")
+        else:
+            print(f"[{worker_id}] Lease für Job {job_id} abgelaufen, Ergebnis verworfen.")
+
+    print(f"[{worker_id}] Keine offenen Jobs mehr, Worker beendet.")
+
+
+def merge_results(queue, run_id: str = None) -> dict:
+    """Führt die Ergebnisse der abgeschlossenen Jobs eines Laufs zu einem Bericht zusammen."""
+    journeys = []
+    failed = []
+    for job in queue.results(run_id):
+        if job["status"] == "done":
+            journeys.append({
+                "job_id": job["job_id"],
+                "search_url": job["payload"]["search_url"],
+                "worker": job["result"]["worker"],
+                "versuche": job["attempts"],
+                "dauer_s": job["result"]["dauer_s"],
+                "budget": job["result"].get("budget"),
+                "steps": job["result"]["steps"],
+            })
+        else:
+            failed.append({
+                "job_id": job["job_id"],
+                "search_url": job["payload"]["search_url"],
+                "versuche": job["attempts"],
+                "fehler": job["error"],
+            })
+    return {"journeys": journeys, "fehlgeschlagen": failed}
+
+
+def run_coordinator(queue_location: str, journeys: list, workers: int, max_attempts: int, output_file: str) -> dict:
+    """
+    Legt die Journeys in der Queue ab, startet lokale Worker-Prozesse, wartet bis die
+    Queue abgearbeitet ist (auch durch Worker auf anderen Hosts) und schreibt den Bericht.
+    """
+    queue = open_queue(queue_location)
+    # Die Queue-Datei bleibt über Läufe hinweg bestehen; der Bericht enthält nur Jobs dieses Laufs
+    run_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    for journey in journeys:
+        queue.enqueue(journey, max_attempts=max_attempts, run_id=run_id)
+    print(f"{len(journeys)} Journeys in '{queue_location}' eingereiht (Lauf {run_id}), starte {workers} Worker-Prozesse...")
+
+    started = time.perf_counter()
+    # "spawn": jeder Worker startet eine frische Interpreter-Instanz mit eigener Event-Loop
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(queue_location, f"{socket.gethostname()}-w{i}"))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    # Worker auf anderen Hosts können noch laufen
+    while not queue.is_drained(run_id):
+        time.sleep(POLL_SECONDS)
+
+    duration = time.perf_counter() - started
+    report = merge_results(queue, run_id)
+    report["lauf"] = run_id
+    report["durchsatz"] = {
+        "worker_prozesse_lokal": workers,
+        "journeys_abgeschlossen": len(report["journeys"]),
+        "dauer_s": round(duration, 2),
+        "journeys_pro_minute": round(len(report["journeys"]) / duration * 60, 2) if duration else None,
+    }
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"\n--- Zusammengeführter Bericht in '{output_file}' gespeichert: {report['durchsatz']} ---")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verteilter Worker-Modus für den WCAG-Agenten")
+    parser.add_argument("mode", choices=["coordinator", "worker"])
+    parser.add_argument("--queue", default="wcag_jobs.db", help="SQLite-Datei oder redis://-URL")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--journeys", help="JSON-Datei mit einer Liste von {search_url, selectors}")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.mode == "worker":
+        run_worker(args.queue)
+    else:
+        if args.journeys:
+            with open(args.journeys, encoding="utf-8") as f:
+                journeys = json.load(f)
+        else:
+            journeys = [{"search_url": "https://www.otto.de/suche/t-shirt"}]
+        output_file = f"wcag_distributed_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        run_coordinator(args.queue, journeys, args.workers, args.max_attempts, output_file)
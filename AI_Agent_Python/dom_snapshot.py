@@ -0,0 +1,255 @@
+import os
+import mmap
+import struct
+import tempfile
+from array import array
+from html import escape
+
+# --- DOM-Erfassung über CDP DOMSnapshot ---
+# Statt page.content() (kompletter HTML-String im Speicher) wird der DOM über das
+# Chrome DevTools Protocol als Knotentabelle abgefragt. Die Tabelle besteht nur aus
+# Integer-Arrays (Eltern-Index, Knotentyp, Namen/Werte als Indizes in eine
+# String-Tabelle) und wird kompakt in eine Datei geschrieben, die per mmap gelesen wird.
+
+SNAPSHOT_MAGIC = b"DSN2"
+_HEADER = struct.Struct("<4sIII")  # Magic, Anzahl Knoten, Anzahl Strings, Anzahl Attribut-Indizes
+
+# Elemente, deren Inhalt für die semantische Analyse nicht relevant ist (wie in helper_tools)
+SKIPPED_ELEMENTS = {"script", "style"}
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+ELEMENT_NODE = 1
+TEXT_NODE = 3
+COMMENT_NODE = 8
+DOCUMENT_NODE = 9
+DOCUMENT_TYPE_NODE = 10
+DOCUMENT_FRAGMENT_NODE = 11
+
+# Bits im flags-Array
+FLAG_PSEUDO_ELEMENT = 1  # ::before, ::marker usw. (kein Teil des HTML)
+
+
+async def capture_dom_snapshot(page, snapshot_dir: str = None) -> "DomSnapshot":
+    """
+    Erfasst den DOM der aktuellen Seite über CDP DOMSnapshot.captureSnapshot und
+    schreibt die Knotentabelle in eine Datei, die anschließend per mmap geöffnet wird.
+
+    Args:
+        page: Playwright-Page (Chromium).
+        snapshot_dir (str): Verzeichnis für die Snapshot-Datei (Standard: temporäres Verzeichnis).
+    Returns:
+        DomSnapshot: Speicherabgebildeter Snapshot, muss mit close() freigegeben werden.
+    """
+    client = await page.context.new_cdp_session(page)
+    try:
+        raw = await client.send("DOMSnapshot.captureSnapshot", {
+            "computedStyles": [],
+            "includeDOMRects": False,
+            "includePaintOrder": False,
+        })
+    finally:
+        await client.detach()
+
+    fd, path = tempfile.mkstemp(prefix="dom_snapshot_", suffix=".bin", dir=snapshot_dir)
+    with os.fdopen(fd, "wb") as f:
+        write_snapshot(raw, f)
+    # Das CDP-Antwort-Dict wird hier nicht mehr gebraucht und kann freigegeben werden
+    del raw
+    return DomSnapshot(path)
+
+
+def write_snapshot(raw: dict, f) -> None:
+    """
+    Schreibt das Hauptdokument einer DOMSnapshot-Antwort als Array-Tabelle in die Datei f.
+    Die Listen werden dabei aus raw entnommen und einzeln umgewandelt und geschrieben,
+    damit nie eine Liste und ihre Array-Kopie für alle Tabellen gleichzeitig im Speicher liegen.
+
+    Layout: Header, parent[n], type[n], name[n], value[n], flags[n], attr_offset[n+1],
+    attr_indices[m], string_offset[s+1], UTF-8-Blob aller Strings.
+    """
+    nodes = raw["documents"][0].pop("nodes")
+    strings = raw.pop("strings")
+    n_nodes = len(nodes["parentIndex"])
+    attributes = nodes.pop("attributes", None) or []
+    n_attrs = sum(len(attrs) for attrs in attributes)
+
+    f.write(_HEADER.pack(SNAPSHOT_MAGIC, n_nodes, len(strings), n_attrs))
+    for key in ("parentIndex", "nodeType", "nodeName"):
+        array("i", nodes.pop(key)).tofile(f)
+    values = nodes.pop("nodeValue", None)
+    (array("i", values) if values else array("i", [-1]) * n_nodes).tofile(f)
+    del values
+
+    flags = array("i", bytes(4 * n_nodes))
+    # pseudoType ist ein "RareStringData": nur die betroffenen Knoten stehen in index
+    for node in (nodes.pop("pseudoType", None) or {}).get("index", []):
+        flags[node] |= FLAG_PSEUDO_ELEMENT
+    flags.tofile(f)
+    del flags
+
+    attr_offsets = array("i", [0])
+    total = 0
+    for node in range(n_nodes):
+        total += len(attributes[node]) if node < len(attributes) else 0
+        attr_offsets.append(total)
+    attr_offsets.tofile(f)
+    del attr_offsets
+    for attrs in attributes:
+        array("i", attrs).tofile(f)
+    del attributes
+
+    # Zwei Durchläufe über die Strings: erst die Offsets, dann der Blob,
+    # statt alle kodierten Strings zwischenzuspeichern
+    string_offsets = array("i", [0])
+    total = 0
+    for s in strings:
+        total += len(s.encode("utf-8"))
+        string_offsets.append(total)
+    string_offsets.tofile(f)
+    del string_offsets
+    for s in strings:
+        f.write(s.encode("utf-8"))
+
+
+class DomSnapshot:
+    """
+    Lesender Zugriff auf eine mit write_snapshot() geschriebene Knotentabelle.
+    Die Arrays sind memoryviews direkt auf die gemappte Datei, es wird nichts kopiert.
+    """
+
+    def __init__(self, path: str, delete_on_close: bool = True):
+        self.path = path
+        self._delete_on_close = delete_on_close
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_nodes, n_strings, n_attrs = _HEADER.unpack_from(self._mm, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Keine gültige DOM-Snapshot-Datei: {path}")
+
+        view = memoryview(self._mm)
+        self._views = [view]
+        pos = _HEADER.size
+
+        def take(count):
+            nonlocal pos
+            part = view[pos:pos + count * 4]
+            table = part.cast("i")
+            pos += count * 4
+            self._views.extend((table, part))
+            return table
+
+        self.node_count = n_nodes
+        self.parents = take(n_nodes)
+        self.node_types = take(n_nodes)
+        self.names = take(n_nodes)
+        self.values = take(n_nodes)
+        self.flags = take(n_nodes)
+        self.attr_offsets = take(n_nodes + 1)
+        self.attr_indices = take(n_attrs)
+        self._string_offsets = take(n_strings + 1)
+        self._blob_start = pos
+
+    def string(self, index: int) -> str:
+        """Liest einen String aus der String-Tabelle (-1 steht für "kein Wert")."""
+        if index < 0:
+            return ""
+        start = self._blob_start + self._string_offsets[index]
+        end = self._blob_start + self._string_offsets[index + 1]
+        return self._mm[start:end].decode("utf-8")
+
+    def attributes(self, node: int):
+        """Liefert die Attribute eines Knotens als (Name, Wert)-Paare."""
+        start, end = self.attr_offsets[node], self.attr_offsets[node + 1]
+        for i in range(start, end, 2):
+            yield self.string(self.attr_indices[i]), self.string(self.attr_indices[i + 1])
+
+    def iter_html(self, skipped_elements: set = SKIPPED_ELEMENTS):
+        """
+        Serialisiert den DOM stückweise als HTML, ohne den gesamten String aufzubauen.
+        Die Knoten liegen in Dokumentreihenfolge vor, daher genügt ein Stack offener Elemente.
+        Skript- und Style-Elemente werden samt Inhalt ausgelassen (Reduktion wie in helper_tools),
+        ebenso Pseudo-Elemente. Document-Fragments (Shadow Roots, Template-Inhalte) sind
+        transparent: ihre Kinder werden direkt im Host-Element ausgegeben.
+        """
+        open_elements = []  # (Knotenindex, Tag-Name oder None für ausgelassene Teilbäume)
+        skip_depth = 0
+        transparent = {}  # Fragment-/Dokument-Knoten -> nächster ausgegebener Vorfahr
+        for node in range(self.node_count):
+            parent = self.parents[node]
+            parent = transparent.get(parent, parent)
+            node_type = self.node_types[node]
+            if node_type in (DOCUMENT_NODE, DOCUMENT_FRAGMENT_NODE):
+                transparent[node] = parent
+                continue
+            while open_elements and open_elements[-1][0] != parent:
+                _, tag = open_elements.pop()
+                if tag is None:
+                    skip_depth -= 1
+                elif skip_depth == 0 and tag not in VOID_ELEMENTS:
+                    yield f"</{tag}>"
+
+            if node_type == ELEMENT_NODE:
+                tag = self.string(self.names[node]).lower()
+                if skip_depth or tag in skipped_elements or self.flags[node] & FLAG_PSEUDO_ELEMENT:
+                    skip_depth += 1
+                    open_elements.append((node, None))
+                    continue
+                attrs = "".join(
+                    f' {name}="{escape(value, quote=True)}"' for name, value in self.attributes(node)
+                )
+                yield f"<{tag}{attrs}>"
+                open_elements.append((node, tag))
+            elif skip_depth:
+                continue
+            elif node_type == TEXT_NODE:
+                yield escape(self.string(self.values[node]), quote=False)
+            elif node_type == DOCUMENT_TYPE_NODE:
+                yield "<!DOCTYPE html>"
+            # Kommentare tragen nichts zur Analyse bei
+
+        while open_elements:
+            _, tag = open_elements.pop()
+            if tag is not None and skip_depth == 0 and tag not in VOID_ELEMENTS:
+                yield f"</{tag}>"
+            elif tag is None:
+                skip_depth -= 1
+
+    def write_html(self, f) -> int:
+        """Schreibt das reduzierte HTML in eine Textdatei und gibt die Anzahl Zeichen zurück."""
+        written = 0
+        for fragment in self.iter_html():
+            written += f.write(fragment)
+        return written
+
+    def reduced_html(self) -> str:
+        """Reduziertes HTML (ohne Skripte/Styles) als String für den Prompt."""
+        # Fragmente blockweise zusammenfügen: eine Liste aller kleinen Fragmente
+        # bräuchte ein Vielfaches des fertigen Strings
+        chunks, fragments = [], []
+        for fragment in self.iter_html():
+            fragments.append(fragment)
+            if len(fragments) >= 4096:
+                chunks.append("".join(fragments))
+                fragments.clear()
+        chunks.append("".join(fragments))
+        return "".join(chunks)
+
+    def close(self) -> None:
+        # Abgeleitete Views zuerst freigeben, sonst lässt sich die mmap nicht schließen
+        for view in reversed(self._views):
+            view.release()
+        self.parents = self.node_types = self.names = self.values = self.flags = None
+        self.attr_offsets = self.attr_indices = self._string_offsets = None
+        self._mm.close()
+        self._file.close()
+        if self._delete_on_close:
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
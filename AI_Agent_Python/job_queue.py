@@ -0,0 +1,390 @@
+import json
+import time
+import sqlite3
+
+# --- Dauerhafte Job-Queue für den verteilten Worker-Modus ---
+# Worker leasen Jobs für eine begrenzte Zeit und verlängern den Lease per Heartbeat.
+# Stirbt ein Worker, läuft der Lease ab und der Job wird erneut vergeben, bis
+# max_attempts erreicht ist. Zwei Backends: SQLite (lokal, mehrere Prozesse auf einem
+# Host) und ein Redis-kompatibler Client (mehrere Hosts).
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """Schnittstelle der Queue-Backends."""
+
+    def enqueue(self, payload: dict, max_attempts: int = 3, run_id: str = None) -> int:
+        raise NotImplementedError
+
+    def lease(self, worker_id: str, lease_seconds: float):
+        """Gibt (job_id, payload) des nächsten freien Jobs zurück oder None."""
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Verlängert den Lease; False, wenn der Job inzwischen einem anderen Worker gehört."""
+        raise NotImplementedError
+
+    def complete(self, job_id: int, worker_id: str, result) -> bool:
+        """Schließt den Job ab; False, wenn der Worker den Lease nicht mehr hält."""
+        raise NotImplementedError
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Stellt den Job zurück oder schreibt ihn ab; False, wenn der Worker den Lease nicht mehr hält.
+        Mit retry=False wird der Job sofort endgültig abgeschrieben, auch wenn noch Versuche übrig sind.
+        """
+        raise NotImplementedError
+
+    def counts(self, run_id: str = None) -> dict:
+        raise NotImplementedError
+
+    def results(self, run_id: str = None) -> list:
+        """Abgeschlossene und endgültig fehlgeschlagene Jobs (optional nur eines Laufs), sortiert nach job_id."""
+        raise NotImplementedError
+
+    def is_drained(self, run_id: str = None) -> bool:
+        counts = self.counts(run_id)
+        return counts.get(PENDING, 0) == 0 and counts.get(LEASED, 0) == 0
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Queue in einer SQLite-Datei. Jeder Prozess öffnet eine eigene Verbindung;
+    das Leasen läuft in einer BEGIN IMMEDIATE-Transaktion und ist damit atomar.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                updated REAL,
+                run_id TEXT
+            )
+        """)
+        # Ältere Queue-Dateien ohne Lauf-Kennung weiterverwenden
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "run_id" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN run_id TEXT")
+
+    def enqueue(self, payload: dict, max_attempts: int = 3, run_id: str = None) -> int:
+        cur = self._conn.execute(
+            "INSERT INTO jobs (payload, status, max_attempts, updated, run_id) VALUES (?, ?, ?, ?, ?)",
+            (json.dumps(payload, ensure_ascii=False), PENDING, max_attempts, time.time(), run_id),
+        )
+        return cur.lastrowid
+
+    def lease(self, worker_id: str, lease_seconds: float):
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs mit abgelaufenem Lease, die keine Versuche mehr haben, endgültig abschreiben
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Lease abgelaufen', updated = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+                (FAILED, now, LEASED, now),
+            )
+            row = self._conn.execute(
+                "SELECT id, payload FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now),
+            ).fetchone()
+            if row is None:
+                self._conn.execute("COMMIT")
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (LEASED, worker_id, now + lease_seconds, now, row[0]),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return row[0], json.loads(row[1])
+
+    # Abgelaufene Leases gelten wie bei Redis als zurückgestellt, auch wenn noch
+    # kein anderer Worker den Job übernommen hat
+    _HOLDS_LEASE = "id = ? AND lease_owner = ? AND status = ? AND lease_expires >= ?"
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        cur = self._conn.execute(
+            f"UPDATE jobs SET lease_expires = ?, updated = ? WHERE {self._HOLDS_LEASE}",
+            (now + lease_seconds, now, job_id, worker_id, LEASED, now),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result) -> bool:
+        now = time.time()
+        cur = self._conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, lease_owner = NULL, lease_expires = NULL, updated = ? "
+            f"WHERE {self._HOLDS_LEASE}",
+            (DONE, json.dumps(result, ensure_ascii=False), now, job_id, worker_id, LEASED, now),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+        # Solange Versuche übrig sind (und ein neuer Versuch sinnvoll ist), geht der Job zurück in die Queue
+        now = time.time()
+        cur = self._conn.execute(
+            "UPDATE jobs SET status = CASE WHEN ? AND attempts < max_attempts THEN ? ELSE ? END, "
+            f"error = ?, lease_owner = NULL, lease_expires = NULL, updated = ? WHERE {self._HOLDS_LEASE}",
+            (retry, PENDING, FAILED, error, now, job_id, worker_id, LEASED, now),
+        )
+        return cur.rowcount == 1
+
+    def counts(self, run_id: str = None) -> dict:
+        now = time.time()
+        run_filter, run_args = ("WHERE run_id = ?", (run_id,)) if run_id else ("", ())
+        counts = dict(self._conn.execute(
+            f"SELECT status, COUNT(*) FROM jobs {run_filter} GROUP BY status", run_args
+        ).fetchall())
+        # Abgelaufene Leases ohne verbleibende Versuche zählen nicht mehr als offen
+        expired = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts"
+            + (" AND run_id = ?" if run_id else ""),
+            (LEASED, now) + run_args,
+        ).fetchone()[0]
+        if expired:
+            counts[LEASED] -= expired
+            counts[FAILED] = counts.get(FAILED, 0) + expired
+        return counts
+
+    def results(self, run_id: str = None) -> list:
+        rows = self._conn.execute(
+            "SELECT id, payload, status, attempts, result, error FROM jobs WHERE status IN (?, ?)"
+            + (" AND run_id = ?" if run_id else "") + " ORDER BY id",
+            (DONE, FAILED) + ((run_id,) if run_id else ()),
+        ).fetchall()
+        return [
+            {
+                "job_id": job_id,
+                "payload": json.loads(payload),
+                "status": status,
+                "attempts": attempts,
+                "result": json.loads(result) if result else None,
+                "error": error,
+            }
+            for job_id, payload, status, attempts, result, error in rows
+        ]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# Lua-Skripte laufen auf dem Server atomar: ein Worker, der zwischen zwei Befehlen
+# abstürzt, kann keinen Job mehr verlieren, und ein veralteter Worker kann einen
+# zurückgestellten Job nicht mehr abschließen. KEYS[1..3] = pending, leases, finished,
+# ARGV[1] = Präfix der Job-Hashes.
+_REQUEUE_EXPIRED_LUA = """
+local function requeue_expired(now)
+    for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], 0, now)) do
+        redis.call('ZREM', KEYS[2], id)
+        local job = ARGV[1] .. id
+        if tonumber(redis.call('HGET', job, 'attempts')) >= tonumber(redis.call('HGET', job, 'max_attempts')) then
+            redis.call('HSET', job, 'status', 'failed', 'error', 'Lease abgelaufen', 'lease_owner', '')
+            redis.call('RPUSH', KEYS[3], id)
+        else
+            redis.call('HSET', job, 'status', 'pending', 'lease_owner', '')
+            redis.call('LPUSH', KEYS[1], id)
+        end
+    end
+end
+"""
+
+# ARGV[2] = jetzt, ARGV[3] = Ablauf des neuen Leases, ARGV[4] = Worker
+_LEASE_LUA = _REQUEUE_EXPIRED_LUA + """
+requeue_expired(ARGV[2])
+local id = redis.call('LPOP', KEYS[1])
+if not id then
+    return false
+end
+local job = ARGV[1] .. id
+redis.call('ZADD', KEYS[2], ARGV[3], id)
+redis.call('HSET', job, 'status', 'leased', 'lease_owner', ARGV[4])
+redis.call('HINCRBY', job, 'attempts', 1)
+return {id, redis.call('HGET', job, 'payload')}
+"""
+
+# ARGV[2] = jetzt
+_REQUEUE_LUA = _REQUEUE_EXPIRED_LUA + """
+requeue_expired(ARGV[2])
+return true
+"""
+
+# Wie _HOLDS_LEASE bei SQLite: Ein abgelaufener Lease gilt als zurückgestellt, auch
+# wenn ihn noch kein lease()/counts() aufgeräumt hat. ARGV[2] = jetzt, ARGV[3] = Job-ID,
+# ARGV[4] = Worker
+_HOLDS_LEASE_LUA = """
+local function holds_lease(job)
+    if redis.call('HGET', job, 'status') ~= 'leased' or redis.call('HGET', job, 'lease_owner') ~= ARGV[4] then
+        return false
+    end
+    local expires = redis.call('ZSCORE', KEYS[2], ARGV[3])
+    return expires and tonumber(expires) >= tonumber(ARGV[2])
+end
+"""
+
+# ARGV[5] = neuer Ablaufzeitpunkt
+_HEARTBEAT_LUA = _HOLDS_LEASE_LUA + """
+local job = ARGV[1] .. ARGV[3]
+if not holds_lease(job) then
+    return 0
+end
+redis.call('ZADD', KEYS[2], 'XX', ARGV[5], ARGV[3])
+return 1
+"""
+
+# ARGV[5] = Ergebnis (JSON)
+_COMPLETE_LUA = _HOLDS_LEASE_LUA + """
+local job = ARGV[1] .. ARGV[3]
+if not holds_lease(job) then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[3])
+redis.call('HSET', job, 'status', 'done', 'result', ARGV[5], 'lease_owner', '')
+redis.call('RPUSH', KEYS[3], ARGV[3])
+return 1
+"""
+
+# ARGV[5] = Fehlermeldung, ARGV[6] = 1, wenn ein neuer Versuch erlaubt ist
+_FAIL_LUA = _HOLDS_LEASE_LUA + """
+local job = ARGV[1] .. ARGV[3]
+if not holds_lease(job) then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[3])
+if ARGV[6] == '1' and tonumber(redis.call('HGET', job, 'attempts')) < tonumber(redis.call('HGET', job, 'max_attempts')) then
+    redis.call('HSET', job, 'status', 'pending', 'error', ARGV[5], 'lease_owner', '')
+    redis.call('RPUSH', KEYS[1], ARGV[3])
+else
+    redis.call('HSET', job, 'status', 'failed', 'error', ARGV[5], 'lease_owner', '')
+    redis.call('RPUSH', KEYS[3], ARGV[3])
+end
+return 1
+"""
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Queue auf einem Redis-kompatiblen Server (Redis, Valkey, KeyDB oder fakeredis in Tests).
+    Freie Jobs liegen in einer Liste, geleaste Jobs in einem Sorted Set mit dem
+    Ablaufzeitpunkt als Score, die Job-Daten in je einem Hash. Alle Zustandswechsel
+    laufen als Lua-Skript und sind damit atomar.
+    """
+
+    def __init__(self, client, prefix: str = "wcag_jobs"):
+        self.client = client
+        self.prefix = prefix
+        self._lease_script = client.register_script(_LEASE_LUA)
+        self._requeue_script = client.register_script(_REQUEUE_LUA)
+        self._heartbeat_script = client.register_script(_HEARTBEAT_LUA)
+        self._complete_script = client.register_script(_COMPLETE_LUA)
+        self._fail_script = client.register_script(_FAIL_LUA)
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "wcag_jobs") -> "RedisJobQueue":
+        import redis  # nur für den verteilten Betrieb über mehrere Hosts nötig
+        return cls(redis.Redis.from_url(url, decode_responses=True), prefix)
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + tuple(str(p) for p in parts))
+
+    def _run(self, script, *args):
+        keys = [self._key("pending"), self._key("leases"), self._key("finished")]
+        return script(keys=keys, args=[self._key("job", "")] + list(args))
+
+    def enqueue(self, payload: dict, max_attempts: int = 3, run_id: str = None) -> int:
+        job_id = self.client.incr(self._key("next_id"))
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self._key("job", job_id), mapping={
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "status": PENDING,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_id": run_id or "",
+        })
+        if run_id:
+            pipe.rpush(self._key("run", run_id), job_id)
+        pipe.rpush(self._key("pending"), job_id)
+        pipe.execute()
+        return job_id
+
+    def lease(self, worker_id: str, lease_seconds: float):
+        now = time.time()
+        leased = self._run(self._lease_script, now, now + lease_seconds, worker_id)
+        if not leased:
+            return None
+        job_id, payload = leased
+        return int(job_id), json.loads(payload)
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        return bool(self._run(self._heartbeat_script, now, job_id, worker_id, now + lease_seconds))
+
+    def complete(self, job_id: int, worker_id: str, result) -> bool:
+        result_json = json.dumps(result, ensure_ascii=False)
+        return bool(self._run(self._complete_script, time.time(), job_id, worker_id, result_json))
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True) -> bool:
+        return bool(self._run(self._fail_script, time.time(), job_id, worker_id, error, 1 if retry else 0))
+
+    def _job_ids(self, run_id: str = None) -> list:
+        if run_id:
+            return self.client.lrange(self._key("run", run_id), 0, -1)
+        return self.client.lrange(self._key("finished"), 0, -1)
+
+    def counts(self, run_id: str = None) -> dict:
+        self._run(self._requeue_script, time.time())
+        if not run_id:
+            finished = self.client.lrange(self._key("finished"), 0, -1)
+            done = sum(1 for job_id in finished if self.client.hget(self._key("job", job_id), "status") == DONE)
+            return {
+                PENDING: self.client.llen(self._key("pending")),
+                LEASED: self.client.zcard(self._key("leases")),
+                DONE: done,
+                FAILED: len(finished) - done,
+            }
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for job_id in self._job_ids(run_id):
+            counts[self.client.hget(self._key("job", job_id), "status")] += 1
+        return counts
+
+    def results(self, run_id: str = None) -> list:
+        results = []
+        for job_id in sorted(int(j) for j in self._job_ids(run_id)):
+            job = self.client.hgetall(self._key("job", job_id))
+            if job["status"] not in (DONE, FAILED):
+                continue
+            results.append({
+                "job_id": job_id,
+                "payload": json.loads(job["payload"]),
+                "status": job["status"],
+                "attempts": int(job["attempts"]),
+                "result": json.loads(job["result"]) if job.get("result") else None,
+                "error": job.get("error"),
+            })
+        return results
+
+
+def open_queue(location: str) -> JobQueue:
+    """Öffnet die Queue: redis://... für einen Redis-kompatiblen Server, sonst Pfad einer SQLite-Datei."""
+    if location.startswith(("redis://", "rediss://", "unix://")):
+        return RedisJobQueue.from_url(location)
+    return SQLiteJobQueue(location)
@@ -0,0 +1,346 @@
+import os
+import re
+import sys
+import json
+import glob
+import time
+import asyncio
+import hashlib
+import argparse
+from datetime import datetime
+
+import google.generativeai as genai
+
+from AI_Agent_FINAL import build_prompt, parse_json_response
+from token_budget import estimate_cost, estimate_tokens, model_prices
+
+# --- A/B-Evaluierung von Modell- und Prompt-Konfigurationen ---
+# Ein fester Korpus erfasster Seiten wird parallel durch mehrere Konfigurationen
+# (Modell, temperature, Prompt-Variante) geschickt. Gemessen werden Latenz-Perzentile,
+# Token-Kosten und die Übereinstimmung der gefundenen WCAG-Kriterien mit den
+# axe-Ergebnissen und mit einem Referenzlauf.
+#
+# Antworten werden pro Konfiguration in recordings/ gespeichert; mit --offline werden
+# ausschließlich diese Aufzeichnungen abgespielt (keine API-Aufrufe). Fehlt dabei eine
+# Aufzeichnung, bricht die Evaluierung ab, statt die Seite stillschweigend auszulassen.
+#
+# Die Kosten werden mit den Preisen des jeweiligen Modells (token_budget.MODEL_PRICES)
+# berechnet; eine Konfiguration kann sie mit "price_input"/"price_output" überschreiben.
+#
+# Aufruf:
+#   python model_evaluation.py                       # live gegen Gemini, fehlende Antworten aufzeichnen
+#   python model_evaluation.py --record              # alle Antworten neu aufzeichnen
+#   python model_evaluation.py --offline             # nur Aufzeichnungen abspielen
+#   python model_evaluation.py --configs configs.json --corpus ../pages
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AXE_RESULTS_DIR = os.path.join(REPO_ROOT, "Axe_devTools_Java_Script", "results")
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+CONCURRENCY = 4
+
+# Zuordnung der axe rule-IDs zu WCAG-Erfolgskriterien (siehe README)
+AXE_RULE_TO_WCAG = {
+    "area-alt": {"2.4.4", "4.1.2"},
+    "button-name": {"4.1.2"},
+    "document-title": {"2.4.2"},
+    "image-alt": {"1.1.1"},
+    "input-button-name": {"4.1.2"},
+    "input-image-alt": {"1.1.1", "4.1.2"},
+    "label": {"4.1.2", "3.3.2", "1.3.1"},
+    "link-name": {"2.4.4", "4.1.2"},
+    "object-alt": {"1.1.1"},
+    "role-img-alt": {"1.1.1"},
+    "select-name": {"4.1.2"},
+    "svg-img-alt": {"1.1.1"},
+    "autocomplete-valid": {"1.3.5"},
+    "empty-heading": {"1.3.1"},
+    "heading-order": {"1.3.1", "2.4.6"},
+    "empty-table-header": {"1.1.1"},
+    "image-redundant-alt": set(),
+}
+
+DEFAULT_CONFIGS = [
+    {"name": "flash-standard", "model": "gemini-2.5-flash", "temperature": 0.1, "prompt": "standard"},
+    {"name": "flash-lite-standard", "model": "gemini-2.5-flash-lite", "temperature": 0.1, "prompt": "standard"},
+    {"name": "pro-standard", "model": "gemini-2.5-pro", "temperature": 0.1, "prompt": "standard"},
+    {"name": "flash-kurz", "model": "gemini-2.5-flash", "temperature": 0.0, "prompt": "kurz"},
+]
+
+_CRITERION_RE = re.compile(r"\b(\d\.\d\.\d{1,2})\b")
+
+
+class MissingRecordingError(RuntimeError):
+    """Im Offline-Modus fehlt für mindestens eine Seite die aufgezeichnete Antwort."""
+
+
+def build_short_prompt(page_html: str, current_url: str, step_description: str, full_interaction_history: list) -> str:
+    return f"""
+    Prüfe das folgende HTML auf Verletzungen der WCAG 2.2 Kriterien der Stufen A und AA.
+    Antworte ausschließlich mit einer JSON-Liste. Jedes Objekt enthält die Felder
+    "Verletztes WCAG_kriterium" (z.B. "1.1.1 Nicht-Text-Inhalt (A)"), "Anzahl der Verletzungen",
+    "Beschreibung der Verletzung" und "CSS-Selektor" (im Format von axe-core).
+
+    Aktuelle Seite: {current_url}
+    Aktueller Zustand im Interaktionspfad: {step_description}
+
+    ```html
+    {page_html}
+    ```
+    """
+
+
+PROMPT_VARIANTS = {
+    "standard": build_prompt,
+    "kurz": build_short_prompt,
+}
+
+
+def load_corpus(corpus_dir: str = None) -> list:
+    """
+    Lädt den Seitenkorpus. Ein Verzeichnis enthält <name>.html und optional <name>.json
+    mit {"url", "description"}. Ohne Verzeichnis wird pro Schritt des neuesten axe-Berichts
+    ein Dokument aus den HTML-Ausschnitten gebaut.
+    """
+    pages = []
+    if corpus_dir:
+        for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+            name = os.path.splitext(os.path.basename(path))[0]
+            meta = {"url": name, "description": name}
+            meta_path = os.path.splitext(path)[0] + ".json"
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding="utf-8") as f:
+                    meta.update(json.load(f))
+            with open(path, encoding="utf-8") as f:
+                pages.append({"name": name, "url": meta["url"], "description": meta["description"], "html": f.read()})
+        return pages
+
+    for step in _latest_axe_report():
+        snippets = [node["html"] for violation in step.get("violations", []) for node in violation.get("nodes", [])]
+        pages.append({
+            "name": f"schritt{step['step']}",
+            "url": step["url"],
+            "description": step["description"],
+            "html": "<html lang=\"de\"><body>\n" + "\n".join(snippets) + "\n</body></html>",
+        })
+    return pages
+
+
+def _latest_axe_report() -> list:
+    paths = sorted(glob.glob(os.path.join(AXE_RESULTS_DIR, "*.json")))
+    latest = [p for p in paths if p.endswith("_Latest.json")] or paths
+    with open(latest[-1], encoding="utf-8") as f:
+        return json.load(f)
+
+
+def axe_criteria_by_url() -> dict:
+    """WCAG-Kriterien, die axe pro URL gemeldet hat (aus dem neuesten Bericht)."""
+    criteria = {}
+    for step in _latest_axe_report():
+        found = set()
+        for violation in step.get("violations", []):
+            found |= AXE_RULE_TO_WCAG.get(violation["id"], set())
+        criteria[step["url"]] = found
+    return criteria
+
+
+def criteria_from_findings(findings) -> set:
+    """Extrahiert die WCAG-Kriterien (z.B. "1.3.1") aus einer Gemini-Antwort."""
+    if isinstance(findings, dict):
+        findings = [findings]
+    criteria = set()
+    for finding in findings or []:
+        if isinstance(finding, dict):
+            criteria |= set(_CRITERION_RE.findall(str(finding.get("Verletztes WCAG_kriterium", ""))))
+    return criteria
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def agreement(found: set, expected: set) -> dict:
+    """Precision/Recall/F1 und Jaccard der gefundenen Kriterien gegenüber einer Erwartung."""
+    overlap = len(found & expected)
+    precision = overlap / len(found) if found else (1.0 if not expected else 0.0)
+    recall = overlap / len(expected) if expected else (1.0 if not found else 0.0)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    union = found | expected
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(f1, 3),
+        "jaccard": round(len(found & expected) / len(union), 3) if union else 1.0,
+    }
+
+
+class RecordedResponses:
+    """
+    Aufgezeichnete Antworten einer Konfiguration, Schlüssel ist ein Hash aus Modell,
+    temperature und Prompt. Im Offline-Modus dient die Aufzeichnung als Ersatz für die API.
+    """
+
+    def __init__(self, config_name: str, recordings_dir: str = None):
+        self.path = os.path.join(recordings_dir or RECORDINGS_DIR, f"{config_name}.json")
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(config: dict, prompt_text: str) -> str:
+        raw = f"{config['model']}|{config['temperature']}|{prompt_text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        return self.entries.get(key)
+
+    def put(self, key: str, entry: dict) -> None:
+        self.entries[key] = entry
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+
+
+async def _call_live(model, config: dict, prompt_text: str) -> dict:
+    started = time.perf_counter()
+    response = await model.generate_content_async(
+        contents=[prompt_text],
+        generation_config={"response_mime_type": "application/json", "temperature": config["temperature"]},
+    )
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "text": response.text,
+        "latency_s": time.perf_counter() - started,
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or estimate_tokens(prompt_text),
+        "output_tokens": getattr(usage, "candidates_token_count", None) or estimate_tokens(response.text),
+    }
+
+
+async def evaluate_config(config: dict, corpus: list, offline: bool, record: bool, semaphore: asyncio.Semaphore) -> dict:
+    """Schickt alle Seiten des Korpus durch eine Konfiguration und sammelt Antworten und Messwerte."""
+    build = PROMPT_VARIANTS[config.get("prompt", "standard")]
+    recordings = RecordedResponses(config["name"])
+    model = None if offline else genai.GenerativeModel(config["model"])
+
+    async def run_page(page):
+        prompt_text = build(page["html"], page["url"], page["description"], [])
+        key = RecordedResponses.key(config, prompt_text)
+        entry = recordings.get(key) if (offline or not record) else None
+        if entry is None:
+            if offline:
+                return page, None
+            async with semaphore:
+                try:
+                    entry = await _call_live(model, config, prompt_text)
+                except Exception as e:
+                    print(f"FEHLER bei {config['name']} / {page['name']}: {e}")
+                    return page, None
+            recordings.put(key, entry)
+        return page, entry
+
+    results = await asyncio.gather(*(run_page(page) for page in corpus))
+    if offline:
+        missing = [page["name"] for page, entry in results if entry is None]
+        if missing:
+            raise MissingRecordingError(
+                f"Keine Aufzeichnung für {config['name']} in {recordings.path}: {', '.join(missing)}. "
+                "Zuerst ohne --offline (oder mit --record) aufzeichnen."
+            )
+    else:
+        recordings.save()
+
+    pages = {}
+    for page, entry in results:
+        if entry is None:
+            continue
+        pages[page["url"]] = {
+            "criteria": criteria_from_findings(parse_json_response(entry["text"])),
+            "latency_s": entry["latency_s"],
+            "prompt_tokens": entry["prompt_tokens"],
+            "output_tokens": entry["output_tokens"],
+        }
+    return pages
+
+
+def config_prices(config: dict) -> tuple:
+    """Preise pro 1 Mio. Tokens: aus der Konfiguration oder aus der Preistabelle des Modells."""
+    if "price_input" in config and "price_output" in config:
+        return config["price_input"], config["price_output"]
+    return model_prices(config["model"])
+
+
+def summarize(config: dict, pages: dict, axe_criteria: dict, reference: dict, corpus_size: int = None) -> dict:
+    latencies = [p["latency_s"] for p in pages.values()]
+    prompt_tokens = sum(p["prompt_tokens"] for p in pages.values())
+    output_tokens = sum(p["output_tokens"] for p in pages.values())
+    price_input, price_output = config_prices(config)
+
+    def mean_agreement(expected_by_url):
+        scores = [agreement(p["criteria"], expected_by_url[url]) for url, p in pages.items() if url in expected_by_url]
+        if not scores:
+            return None
+        return {k: round(sum(s[k] for s in scores) / len(scores), 3) for k in scores[0]}
+
+    return {
+        "konfiguration": config,
+        "seiten": len(pages),
+        "seiten_ohne_antwort": (corpus_size - len(pages)) if corpus_size is not None else None,
+        "latenz_s": {"p50": percentile(latencies, 50), "p90": percentile(latencies, 90), "p99": percentile(latencies, 99)},
+        "tokens": {"prompt": prompt_tokens, "output": output_tokens},
+        "preise_pro_mio_tokens": {"input": price_input, "output": price_output},
+        "kosten_usd": estimate_cost(prompt_tokens, output_tokens, price_input, price_output),
+        "uebereinstimmung_axe": mean_agreement(axe_criteria),
+        "uebereinstimmung_referenz": mean_agreement({url: p["criteria"] for url, p in reference.items()}),
+    }
+
+
+async def run_evaluation(configs: list, corpus: list, offline: bool, record: bool) -> dict:
+    """Führt alle Konfigurationen parallel aus; die erste Konfiguration ist der Referenzlauf."""
+    # Preise vorab prüfen, damit ein unbekanntes Modell nicht erst nach allen API-Aufrufen auffällt
+    for config in configs:
+        config_prices(config)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    all_pages = await asyncio.gather(*(evaluate_config(c, corpus, offline, record, semaphore) for c in configs))
+    axe_criteria = axe_criteria_by_url()
+    reference = all_pages[0]
+    return {
+        "referenz": configs[0]["name"],
+        "korpus": [page["url"] for page in corpus],
+        "ergebnisse": [
+            summarize(c, pages, axe_criteria, reference, len(corpus)) for c, pages in zip(configs, all_pages)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="A/B-Evaluierung von Gemini-Modellen und Prompts")
+    parser.add_argument("--configs", help="JSON-Datei mit einer Liste von {name, model, temperature, prompt}, "
+                                          "optional price_input/price_output pro 1 Mio. Tokens")
+    parser.add_argument("--corpus", help="Verzeichnis mit erfassten Seiten (*.html, optional *.json)")
+    parser.add_argument("--offline", action="store_true", help="Nur aufgezeichnete Antworten verwenden")
+    parser.add_argument("--record", action="store_true", help="Vorhandene Aufzeichnungen ignorieren und neu aufzeichnen")
+    args = parser.parse_args()
+
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+    else:
+        configs = DEFAULT_CONFIGS
+
+    try:
+        evaluation = asyncio.run(run_evaluation(configs, load_corpus(args.corpus), args.offline, args.record))
+    except (MissingRecordingError, ValueError) as e:
+        sys.exit(f"FEHLER: {e}")
+    output_file = f"wcag_model_evaluation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(evaluation, f, indent=4, ensure_ascii=False)
+    for result in evaluation["ergebnisse"]:
+        print(f"{result['konfiguration']['name']}: Latenz {result['latenz_s']}, Kosten {result['kosten_usd']} USD, "
+              f"axe {result['uebereinstimmung_axe']}, Referenz {result['uebereinstimmung_referenz']}")
+    print(f"\n--- Evaluierung in '{output_file}' gespeichert. ---")
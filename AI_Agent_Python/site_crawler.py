@@ -0,0 +1,366 @@
+import re
+import json
+import asyncio
+import argparse
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from playwright.async_api import async_playwright
+
+import AI_Agent_FINAL
+from AI_Agent_FINAL import BASE_URL, SELECTORS, analyze_with_gemini, capture_page_html
+
+# --- Template-basierter Site-Crawl ---
+# Ausgehend von BASE_URL werden Links gesammelt und die Seiten anhand von URL-Muster
+# und struktureller Signatur (Grundgerüst des DOM) zu Seitentemplates gruppiert.
+# Nur eine konfigurierbare Stichprobe pro Template (Standard: 2 Seiten) geht an Gemini;
+# alle übrigen Seiten bekommen günstige Prüfungen direkt im Browser.
+# Der Crawl beachtet robots.txt und hält zwischen zwei Seitenaufrufen einen Mindestabstand ein.
+
+SAMPLES_PER_TEMPLATE = 2
+MAX_PAGES = 200
+CONCURRENCY = 4
+# Mindestabstand zwischen zwei Seitenaufrufen beim (einzigen) gecrawlten Host,
+# ein größerer Crawl-delay aus robots.txt hat Vorrang
+REQUEST_DELAY_SECONDS = 1.0
+ROBOTS_USER_AGENT = "WCAG-Agent"
+# Ab dieser Jaccard-Ähnlichkeit der Signaturen gelten zwei Seiten als gleiches Template
+SIMILARITY_THRESHOLD = 0.8
+
+_ID_SEGMENT_RE = re.compile(r"\d")
+_SKIPPED_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".pdf", ".zip", ".css", ".js")
+
+# Grundgerüst der Seite: Tag-Pfade mit Rolle/Landmark bis Tiefe 5, ohne Inhalt
+FINGERPRINT_JS = """
+() => {
+    const tokens = new Set();
+    const walk = (el, path, depth) => {
+        if (depth > 5) return;
+        for (const child of el.children) {
+            const tag = child.tagName.toLowerCase();
+            if (tag === 'script' || tag === 'style' || tag === 'noscript') continue;
+            const role = child.getAttribute('role');
+            const token = path + '/' + tag + (role ? '[' + role + ']' : '');
+            tokens.add(token);
+            walk(child, token, depth + 1);
+        }
+    };
+    walk(document.body || document.documentElement, 'body', 0);
+    return Array.from(tokens);
+}
+"""
+
+LINKS_JS = "() => Array.from(document.querySelectorAll('a[href]'), a => a.href)"
+
+# Günstige Prüfungen ohne LLM (ähnlich einzelnen axe-Regeln)
+CHEAP_CHECKS_JS = """
+() => {
+    const name = el => (el.getAttribute('aria-label') || el.getAttribute('title') || el.textContent || '').trim();
+    const labelled = el => el.labels && el.labels.length > 0 || el.getAttribute('aria-label') || el.getAttribute('aria-labelledby');
+    const headings = Array.from(document.querySelectorAll('h1,h2,h3,h4,h5,h6')).map(h => parseInt(h.tagName[1]));
+    let headingSkips = 0;
+    for (let i = 1; i < headings.length; i++) if (headings[i] - headings[i - 1] > 1) headingSkips++;
+    return {
+        "document-title": document.title.trim() ? 0 : 1,
+        "html-has-lang": document.documentElement.getAttribute('lang') ? 0 : 1,
+        "image-alt": document.querySelectorAll('img:not([alt]):not([role="presentation"])').length,
+        "link-name": Array.from(document.querySelectorAll('a[href]')).filter(a => !name(a) && !a.querySelector('img[alt]:not([alt=""])')).length,
+        "button-name": Array.from(document.querySelectorAll('button')).filter(b => !name(b)).length,
+        "label": Array.from(document.querySelectorAll('input:not([type=hidden]):not([type=submit]):not([type=button]),select,textarea')).filter(i => !labelled(i)).length,
+        "empty-heading": Array.from(document.querySelectorAll('h1,h2,h3,h4,h5,h6')).filter(h => !h.textContent.trim()).length,
+        "heading-order": headingSkips,
+    };
+}
+"""
+
+
+def normalize_url(url: str) -> str:
+    """Entfernt Fragment und Query, damit Varianten derselben Seite nur einmal besucht werden."""
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path or "/", "", ""))
+
+
+def url_pattern(url: str) -> str:
+    """
+    Verallgemeinert den Pfad zu einem Muster: Segmente mit Ziffern (Artikel-IDs) werden zu {id},
+    alle Segmente nach dem ersten zu * (z.B. /p/tom-tailor-jeans-C1473510499/ -> /p/{id}).
+    """
+    segments = [s for s in urlsplit(url).path.split("/") if s]
+    pattern = []
+    for i, segment in enumerate(segments):
+        if _ID_SEGMENT_RE.search(segment):
+            pattern.append("{id}")
+        elif i == 0:
+            pattern.append(segment)
+        else:
+            pattern.append("*")
+    return "/" + "/".join(pattern)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class PageTemplate:
+    def __init__(self, template_id: int, pattern: str, fingerprint: frozenset):
+        self.template_id = template_id
+        self.pattern = pattern
+        self.fingerprint = fingerprint
+        self.urls = []
+        self.sampled = []
+        # Stichprobenplätze, deren Analyse gerade läuft
+        self.in_progress = 0
+        self.llm_results = []
+        self.cheap_checks = {}
+
+    def to_report(self) -> dict:
+        return {
+            "template": self.template_id,
+            "url_muster": self.pattern,
+            "seiten": len(self.urls),
+            "mit_llm_analysiert": len(self.sampled),
+            "nur_guenstige_pruefungen": len(self.urls) - len(self.sampled),
+            "abdeckung": {
+                "llm": round(len(self.sampled) / len(self.urls), 3) if self.urls else 0.0,
+                "guenstige_pruefungen": 1.0,
+            },
+            "stichprobe": self.sampled,
+            "beispiel_urls": self.urls[:10],
+            "guenstige_pruefungen": self.cheap_checks,
+            "llm_ergebnisse": self.llm_results,
+        }
+
+
+class TemplateCrawler:
+    """
+    Crawlt eine Website ab start_url (nur gleicher Host) und ordnet jede Seite einem Template zu.
+    """
+
+    def __init__(self, start_url: str, samples_per_template: int = SAMPLES_PER_TEMPLATE,
+                 max_pages: int = MAX_PAGES, concurrency: int = CONCURRENCY):
+        self.start_url = start_url
+        self.host = urlsplit(start_url).netloc
+        self.samples_per_template = samples_per_template
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.templates = []
+        self.seen = set()
+        self.assigned = set()
+        self.frontier = asyncio.Queue()
+        self.visited = 0
+        self.robots = None
+        self.request_delay = REQUEST_DELAY_SECONDS
+        self._host_lock = asyncio.Lock()
+        self._next_request_at = 0.0
+
+    def _enqueue(self, url: str) -> None:
+        url = normalize_url(url)
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or parts.netloc != self.host:
+            return
+        if parts.path.lower().endswith(_SKIPPED_EXTENSIONS):
+            return
+        if url in self.seen or len(self.seen) >= self.max_pages:
+            return
+        if self.robots is not None and not self.robots.can_fetch(ROBOTS_USER_AGENT, url):
+            return
+        self.seen.add(url)
+        self.frontier.put_nowait(url)
+
+    async def _load_robots(self, context) -> None:
+        """Lädt robots.txt über den Browser-Kontext (gleiche Header wie die Seitenaufrufe)."""
+        parts = urlsplit(self.start_url)
+        robots_url = urlunsplit((parts.scheme, parts.netloc, "/robots.txt", "", ""))
+        robots = RobotFileParser(robots_url)
+        try:
+            response = await context.request.get(robots_url)
+            # Gleiche Regeln wie RobotFileParser.read(): 401/403 sperrt alles, andere Fehler erlauben alles
+            if response.status in (401, 403):
+                robots.disallow_all = True
+            elif response.status >= 400:
+                robots.allow_all = True
+            else:
+                robots.parse((await response.text()).splitlines())
+        except Exception as e:
+            print(f"robots.txt nicht abrufbar ({e}), crawle ohne Einschränkungen.")
+            robots.allow_all = True
+        self.robots = robots
+        crawl_delay = robots.crawl_delay(ROBOTS_USER_AGENT)
+        if crawl_delay:
+            self.request_delay = max(self.request_delay, float(crawl_delay))
+
+    async def _wait_for_host(self) -> None:
+        # Alle Worker teilen sich einen Zeitplan, es wird nur ein Host gecrawlt
+        async with self._host_lock:
+            loop = asyncio.get_running_loop()
+            wait = self._next_request_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_request_at = loop.time() + self.request_delay
+
+    def assign_template(self, url: str, fingerprint: frozenset) -> PageTemplate:
+        """Sucht das ähnlichste Template mit gleichem URL-Muster oder legt ein neues an."""
+        pattern = url_pattern(url)
+        best, best_score = None, 0.0
+        for template in self.templates:
+            if template.pattern != pattern:
+                continue
+            score = jaccard(template.fingerprint, fingerprint)
+            if score > best_score:
+                best, best_score = template, score
+        if best is None or best_score < SIMILARITY_THRESHOLD:
+            best = PageTemplate(len(self.templates) + 1, pattern, fingerprint)
+            self.templates.append(best)
+        best.urls.append(url)
+        return best
+
+    async def _accept_cookies(self, page) -> None:
+        selector = SELECTORS.get("cookie_accept_button_selector")
+        if not selector:
+            return
+        try:
+            await page.locator(selector).click(timeout=5000)
+            await page.wait_for_load_state("networkidle", timeout=10000)
+        except Exception as cookie_error:
+            print(f"Cookie-Banner nicht gefunden oder bereits geschlossen: {cookie_error}")
+
+    async def _visit(self, page, url: str) -> bool:
+        """Besucht eine Seite; False, wenn sie nach einer Weiterleitung schon zugeordnet war."""
+        await self._wait_for_host()
+        await page.goto(url, wait_until="networkidle")
+        # Weiterleitungen (z.B. /p/123 -> /p/artikel-123/) nicht doppelt zählen oder analysieren
+        current_url = normalize_url(page.url)
+        if current_url in self.assigned or urlsplit(current_url).netloc != self.host:
+            return False
+        self.assigned.add(current_url)
+        self.seen.add(current_url)
+        fingerprint = frozenset(await page.evaluate(FINGERPRINT_JS))
+        checks = await page.evaluate(CHEAP_CHECKS_JS)
+        for link in await page.evaluate(LINKS_JS):
+            self._enqueue(urljoin(current_url, link))
+
+        template = self.assign_template(current_url, fingerprint)
+        for rule, count in checks.items():
+            template.cheap_checks[rule] = template.cheap_checks.get(rule, 0) + count
+
+        # Stichprobenplatz vor dem ersten await reservieren, damit parallele Worker ihn nicht doppelt vergeben;
+        # scheitert die Analyse, wird er für die nächste Seite des Templates wieder frei
+        if len(template.sampled) + template.in_progress < self.samples_per_template:
+            template.in_progress += 1
+            try:
+                if await self._analyze_sample(page, template, current_url):
+                    template.sampled.append(current_url)
+            finally:
+                template.in_progress -= 1
+        return True
+
+    async def _analyze_sample(self, page, template: PageTemplate, url: str) -> bool:
+        """LLM-Analyse einer Stichprobenseite; False, wenn sie nicht (vollständig) gesendet wurde."""
+        step_description = f"Template {template.template_id} ({template.pattern}): {url}"
+        print(f"LLM-Analyse für {step_description}")
+        html = await capture_page_html(page)
+        step_results = await analyze_with_gemini(html, url, step_description, [])
+        # Übersprungene (Budget) oder fehlgeschlagene Requests tauchen nicht als verbuchte Requests auf
+        usage = AI_Agent_FINAL.RUN_BUDGET.usage_for(step_description)
+        if not usage.get("requests") or usage.get("nicht_gesendete_tokens"):
+            print(f"Analyse für {url} nicht (vollständig) durchgeführt, zählt nicht zur Stichprobe.")
+            return False
+        template.llm_results.append({"url": url, "violations": step_results})
+        return True
+
+    async def _prepare_context(self, context) -> None:
+        """Cookie-Einwilligung einmal vor dem Start der Worker (gilt für den gesamten Browser-Kontext)."""
+        page = await context.new_page()
+        try:
+            await self._wait_for_host()
+            await page.goto(self.start_url, wait_until="networkidle")
+            await self._accept_cookies(page)
+        except Exception as e:
+            print(f"Startseite für die Cookie-Einwilligung nicht erreichbar: {e}")
+        finally:
+            await page.close()
+
+    async def _worker(self, context) -> None:
+        page = await context.new_page()
+        try:
+            while True:
+                url = await self.frontier.get()
+                try:
+                    if await self._visit(page, url):
+                        self.visited += 1
+                except Exception as e:
+                    print(f"FEHLER beim Besuch von {url}: {e}")
+                finally:
+                    self.frontier.task_done()
+        finally:
+            await page.close()
+
+    async def crawl(self) -> dict:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context()
+            try:
+                await self._load_robots(context)
+                self._enqueue(self.start_url)
+                if self.frontier.empty():
+                    print(f"{self.start_url} ist laut robots.txt für {ROBOTS_USER_AGENT} gesperrt.")
+                await self._prepare_context(context)
+                workers = {asyncio.create_task(self._worker(context)) for _ in range(self.concurrency)}
+                drained = asyncio.create_task(self.frontier.join())
+                # Sterben alle Worker (z.B. new_page schlägt fehl), würde join() ewig warten
+                running = set(workers)
+                while running and not drained.done():
+                    done, _ = await asyncio.wait(running | {drained}, return_when=asyncio.FIRST_COMPLETED)
+                    for worker in done & running:
+                        print(f"FEHLER: Crawl-Worker beendet: {worker.exception()}")
+                    running -= done
+                drained.cancel()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(drained, *workers, return_exceptions=True)
+            finally:
+                await browser.close()
+        return self.report()
+
+    def report(self) -> dict:
+        sampled_pages = sum(len(t.sampled) for t in self.templates)
+        # Gechunkte Analysen brauchen mehrere Requests pro Seite, deshalb aus dem Budget-Protokoll
+        llm_calls = sum(entry["requests"] for entry in AI_Agent_FINAL.RUN_BUDGET.records.values())
+        # Hochrechnung: so viele Aufrufe hätte die Analyse jeder besuchten Seite gekostet
+        exhaustive_calls = round(self.visited * llm_calls / sampled_pages) if sampled_pages else 0
+        return {
+            "start_url": self.start_url,
+            "seiten_besucht": self.visited,
+            "templates": len(self.templates),
+            "seiten_mit_llm": sampled_pages,
+            "llm_aufrufe": llm_calls,
+            "llm_aufrufe_erschoepfend": exhaustive_calls,
+            "llm_aufrufe_eingespart": exhaustive_calls - llm_calls,
+            "seiten_ohne_llm": self.visited - sampled_pages,
+            "abstand_zwischen_aufrufen_s": self.request_delay,
+            "budget": AI_Agent_FINAL.RUN_BUDGET.summary(),
+            "uebersprungene_schritte": AI_Agent_FINAL.RUN_BUDGET.skipped_steps(),
+            "template_details": [t.to_report() for t in self.templates],
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Template-basierter WCAG-Crawl einer Website")
+    parser.add_argument("--start-url", default=BASE_URL)
+    parser.add_argument("--samples", type=int, default=SAMPLES_PER_TEMPLATE, help="LLM-Stichprobe pro Template")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+
+    crawler = TemplateCrawler(args.start_url, args.samples, args.max_pages, args.concurrency)
+    crawl_report = asyncio.run(crawler.crawl())
+
+    output_file = f"wcag_site_crawl_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(crawl_report, f, indent=4, ensure_ascii=False)
+    print(f"\n--- Crawl-Bericht in '{output_file}' gespeichert: {crawl_report['templates']} Templates, "
+          f"{crawl_report['llm_aufrufe']} LLM-Aufrufe für {crawl_report['seiten_mit_llm']} von "
+          f"{crawl_report['seiten_besucht']} Seiten, {crawl_report['llm_aufrufe_eingespart']} eingespart. ---")
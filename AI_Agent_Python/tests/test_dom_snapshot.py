@@ -0,0 +1,47 @@
+import io
+import os
+import json
+
+from dom_snapshot import DomSnapshot, write_snapshot
+
+# Aufgezeichnete DOMSnapshot.captureSnapshot-Antwort (Chromium) mit Shadow Root,
+# <template>-Inhalt, ::marker-Pseudo-Element und <script> im Kopf
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "dom_snapshot_shadow_root.json")
+
+
+def load_snapshot(tmp_path) -> DomSnapshot:
+    with open(FIXTURE, encoding="utf-8") as f:
+        raw = json.load(f)
+    path = tmp_path / "snapshot.bin"
+    with open(path, "wb") as f:
+        write_snapshot(raw, f)
+    return DomSnapshot(str(path))
+
+
+def test_reduced_html_treats_fragments_as_transparent(tmp_path):
+    with load_snapshot(tmp_path) as snapshot:
+        html = snapshot.reduced_html()
+    assert html == (
+        '<!DOCTYPE html><html lang="de"><head></head><body>'
+        "<ul><li>Eins</li></ul>"
+        '<div id="host"><span>Schatten</span></div>'
+        "<p>Danach &amp; mehr</p>"
+        "<template><b>T</b></template>"
+        "</body></html>"
+    )
+
+
+def test_pseudo_elements_and_scripts_are_skipped(tmp_path):
+    with load_snapshot(tmp_path) as snapshot:
+        html = snapshot.reduced_html()
+    assert "marker" not in html
+    assert "window.x" not in html
+
+
+def test_write_html_streams_same_output(tmp_path):
+    with load_snapshot(tmp_path) as snapshot:
+        out = io.StringIO()
+        written = snapshot.write_html(out)
+        assert out.getvalue() == snapshot.reduced_html()
+        assert written == len(out.getvalue())
+    assert not os.path.exists(tmp_path / "snapshot.bin")
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, RedisJobQueue, SQLiteJobQueue
+
+SHORT_LEASE = 0.05
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        queue = SQLiteJobQueue(str(tmp_path / "jobs.db"))
+        yield queue
+        queue.close()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # Lua-Skripte in fakeredis
+        yield RedisJobQueue(fakeredis.FakeRedis(decode_responses=True))
+
+
+def expire_lease():
+    time.sleep(SHORT_LEASE * 3)
+
+
+def test_lease_complete_and_results(queue):
+    job_id = queue.enqueue({"search_url": "https://www.otto.de/suche/t-shirt"})
+    assert queue.lease("w1", 60) == (job_id, {"search_url": "https://www.otto.de/suche/t-shirt"})
+    assert queue.lease("w2", 60) is None
+    assert queue.complete(job_id, "w1", {"steps": []})
+    assert queue.is_drained()
+    [job] = queue.results()
+    assert job["status"] == DONE and job["result"] == {"steps": []} and job["attempts"] == 1
+
+
+def test_stale_worker_cannot_finish_requeued_job(queue):
+    job_id = queue.enqueue({"search_url": "a"})
+    queue.lease("w1", SHORT_LEASE)
+    expire_lease()
+    assert not queue.is_drained()
+    # Der abgelaufene Worker darf den Job weder abschließen noch zurückstellen
+    assert not queue.complete(job_id, "w1", {"steps": ["alt"]})
+    assert not queue.fail(job_id, "w1", "alt")
+    assert queue.lease("w2", 60)[0] == job_id
+    assert not queue.heartbeat(job_id, "w1", 60)
+    assert queue.heartbeat(job_id, "w2", 60)
+    assert queue.complete(job_id, "w2", {"steps": ["neu"]})
+    assert not queue.complete(job_id, "w2", {"steps": ["doppelt"]})
+    assert [job["result"] for job in queue.results()] == [{"steps": ["neu"]}]
+
+
+def test_expired_lease_is_released_without_sweep(queue):
+    # Ohne lease()/counts() dazwischen: der Lease ist abgelaufen, aber noch nicht aufgeräumt
+    job_id = queue.enqueue({"search_url": "a"})
+    queue.lease("w1", SHORT_LEASE)
+    expire_lease()
+    assert not queue.heartbeat(job_id, "w1", 60)
+    assert not queue.complete(job_id, "w1", {"steps": ["alt"]})
+    assert not queue.fail(job_id, "w1", "alt")
+    assert queue.lease("w2", 60)[0] == job_id
+
+
+def test_failed_job_is_retried_until_max_attempts(queue):
+    job_id = queue.enqueue({"search_url": "a"}, max_attempts=2)
+    queue.lease("w1", 60)
+    assert queue.fail(job_id, "w1", "Absturz")
+    assert queue.lease("w1", 60)[0] == job_id
+    assert queue.fail(job_id, "w1", "Absturz")
+    assert queue.lease("w1", 60) is None
+    [job] = queue.results()
+    assert job["status"] == FAILED and job["attempts"] == 2 and job["error"] == "Absturz"
+
+
+def test_fail_without_retry_skips_remaining_attempts(queue):
+    job_id = queue.enqueue({"search_url": "a"}, max_attempts=3)
+    queue.lease("w1", 60)
+    assert queue.fail(job_id, "w1", "Budget erschöpft", retry=False)
+    assert queue.lease("w1", 60) is None
+    assert queue.is_drained()
+    [job] = queue.results()
+    assert job["status"] == FAILED and job["attempts"] == 1 and job["error"] == "Budget erschöpft"
+
+
+def test_expired_lease_without_attempts_left_fails(queue):
+    queue.enqueue({"search_url": "a"}, max_attempts=1)
+    queue.lease("w1", SHORT_LEASE)
+    expire_lease()
+    assert queue.lease("w2", 60) is None
+    assert queue.is_drained()
+    assert queue.counts()[FAILED] == 1
+
+
+def test_results_are_filtered_by_run(queue):
+    old = queue.enqueue({"search_url": "alt"}, run_id="lauf-1")
+    queue.lease("w1", 60)
+    queue.complete(old, "w1", {"steps": []})
+    new = queue.enqueue({"search_url": "neu"}, run_id="lauf-2")
+    assert not queue.is_drained("lauf-2")
+    assert queue.is_drained("lauf-1")
+    queue.lease("w1", 60)
+    queue.complete(new, "w1", {"steps": []})
+    assert [job["job_id"] for job in queue.results("lauf-2")] == [new]
+    assert [job["job_id"] for job in queue.results()] == [old, new]
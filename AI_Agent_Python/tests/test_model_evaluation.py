@@ -0,0 +1,80 @@
+import json
+import asyncio
+
+import pytest
+
+# model_evaluation importiert AI_Agent_FINAL (Playwright, Gemini-SDK)
+for module in ("dotenv", "playwright.async_api", "google.generativeai", "pydantic"):
+    pytest.importorskip(module)
+
+import model_evaluation
+from model_evaluation import (
+    PROMPT_VARIANTS, MissingRecordingError, RecordedResponses, evaluate_config, run_evaluation, summarize,
+)
+
+PAGES = {"https://www.otto.de/suche/t-shirt": {
+    "criteria": {"1.1.1"}, "latency_s": 1.0, "prompt_tokens": 1_000_000, "output_tokens": 100_000,
+}}
+CORPUS = [{"name": "schritt1", "url": "https://www.otto.de/suche/t-shirt", "description": "Suchergebnisseite",
+           "html": "<html><body><img src=\"a.jpg\"></body></html>"}]
+
+
+@pytest.mark.parametrize("model, expected", [
+    ("gemini-2.5-flash", 0.30 + 0.25),
+    ("gemini-2.5-flash-lite", 0.10 + 0.04),
+    ("gemini-2.5-pro", 1.25 + 1.00),
+])
+def test_cost_uses_model_prices(model, expected):
+    config = {"name": model, "model": model, "temperature": 0.1}
+    assert summarize(config, PAGES, {}, PAGES)["kosten_usd"] == pytest.approx(expected)
+
+
+def test_config_prices_override_model_prices():
+    config = {"name": "eigen", "model": "gemini-neu", "temperature": 0.1, "price_input": 2.0, "price_output": 0.0}
+    assert summarize(config, PAGES, {}, PAGES)["kosten_usd"] == pytest.approx(2.0)
+
+
+def test_unknown_model_without_prices_fails():
+    with pytest.raises(ValueError, match="gemini-neu"):
+        summarize({"name": "x", "model": "gemini-neu", "temperature": 0.1}, PAGES, {}, PAGES)
+
+
+def test_offline_without_recording_fails_loudly(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_evaluation, "RECORDINGS_DIR", str(tmp_path))
+    config = {"name": "flash-standard", "model": "gemini-2.5-flash", "temperature": 0.1, "prompt": "standard"}
+    with pytest.raises(MissingRecordingError, match="schritt1"):
+        asyncio.run(evaluate_config(config, CORPUS, offline=True, record=False, semaphore=asyncio.Semaphore(1)))
+
+
+def record(recordings_dir, config, page, criteria, latency_s):
+    """Schreibt eine synthetische Aufzeichnung unter dem Schlüssel, den evaluate_config berechnet."""
+    prompt_text = PROMPT_VARIANTS[config["prompt"]](page["html"], page["url"], page["description"], [])
+    findings = [{"Verletztes WCAG_kriterium": criterion} for criterion in criteria]
+    recordings = RecordedResponses(config["name"], str(recordings_dir))
+    recordings.put(RecordedResponses.key(config, prompt_text), {
+        "text": json.dumps(findings), "latency_s": latency_s, "prompt_tokens": 1_000_000, "output_tokens": 100_000,
+    })
+    recordings.save()
+
+
+def test_offline_replay_end_to_end(monkeypatch, tmp_path):
+    monkeypatch.setattr(model_evaluation, "RECORDINGS_DIR", str(tmp_path))
+    url = CORPUS[0]["url"]
+    monkeypatch.setattr(model_evaluation, "axe_criteria_by_url", lambda: {url: {"1.1.1"}})
+    reference = {"name": "flash-standard", "model": "gemini-2.5-flash", "temperature": 0.1, "prompt": "standard"}
+    short = {"name": "flash-kurz", "model": "gemini-2.5-flash", "temperature": 0.0, "prompt": "kurz"}
+    record(tmp_path, reference, CORPUS[0], ["1.1.1 Nicht-Text-Inhalt (A)", "4.1.2 Name, Rolle, Wert (A)"], 2.0)
+    record(tmp_path, short, CORPUS[0], ["1.1.1 Nicht-Text-Inhalt (A)"], 1.0)
+
+    evaluation = asyncio.run(run_evaluation([reference, short], CORPUS, offline=True, record=False))
+    ref_result, short_result = evaluation["ergebnisse"]
+    assert evaluation["referenz"] == "flash-standard"
+    assert ref_result["latenz_s"] == {"p50": 2.0, "p90": 2.0, "p99": 2.0}
+    assert short_result["latenz_s"]["p50"] == 1.0
+    assert ref_result["kosten_usd"] == short_result["kosten_usd"] == pytest.approx(0.30 + 0.25)
+    # Referenz meldet zusätzlich 4.1.2, das axe nicht findet
+    assert ref_result["uebereinstimmung_axe"] == {"precision": 0.5, "recall": 1.0, "f1": 0.667, "jaccard": 0.5}
+    assert ref_result["uebereinstimmung_referenz"] == {"precision": 1.0, "recall": 1.0, "f1": 1.0, "jaccard": 1.0}
+    assert short_result["uebereinstimmung_axe"] == {"precision": 1.0, "recall": 1.0, "f1": 1.0, "jaccard": 1.0}
+    assert short_result["uebereinstimmung_referenz"] == {"precision": 1.0, "recall": 0.5, "f1": 0.667, "jaccard": 0.5}
+    assert short_result["seiten_ohne_antwort"] == 0
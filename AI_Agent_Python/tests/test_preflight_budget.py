@@ -0,0 +1,125 @@
+import asyncio
+import json
+
+import pytest
+
+# AI_Agent_FINAL lädt beim Import Playwright und das Gemini-SDK
+for module in ("dotenv", "playwright.async_api", "google.generativeai", "pydantic"):
+    pytest.importorskip(module)
+
+import AI_Agent_FINAL
+from token_budget import CHARS_PER_TOKEN, TokenBudget
+
+STEP = "Suchergebnisseite"
+URL = "https://www.otto.de/suche/t-shirt"
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, prompt_tokens):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt_tokens, 50)
+
+
+class FakeCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class FakeModel:
+    """Ersetzt genai.GenerativeModel: zählt Tokens lokal und liefert eine feste Verletzung."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def count_tokens_async(self, contents):
+        return FakeCount(len(contents[0]) // CHARS_PER_TOKEN)
+
+    async def generate_content_async(self, contents, generation_config=None):
+        self.prompts.append(contents[0])
+        violation = {"Verletztes WCAG_kriterium": "1.1.1 Nicht-Text-Inhalt (A)"}
+        return FakeResponse(json.dumps([violation]), len(contents[0]) // CHARS_PER_TOKEN)
+
+
+class DenseFakeModel(FakeModel):
+    """Tokenisiert dichter als die lokale Schätzung (2 statt 4 Zeichen pro Token)."""
+
+    async def count_tokens_async(self, contents):
+        return FakeCount(len(contents[0]) // 2)
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(AI_Agent_FINAL, "GEMINI_MODEL", model)
+    return model
+
+
+def use_budget(monkeypatch, max_tokens_per_step, max_tokens_per_run):
+    budget = TokenBudget(max_tokens_per_step, max_tokens_per_run)
+    monkeypatch.setattr(AI_Agent_FINAL, "RUN_BUDGET", budget)
+    return budget
+
+
+def analyze(page_html):
+    return asyncio.run(AI_Agent_FINAL.analyze_with_gemini(page_html, URL, STEP, []))
+
+
+def page(body: str) -> str:
+    return f"<!DOCTYPE html><html lang=\"de\"><head><title>T-Shirts</title></head><body>{body}</body></html>"
+
+
+TILES = "".join(f'<article><a href="/p/{i}/"><img src="/i/{i}.jpg"></a></article>' for i in range(400))
+BIG_SCRIPT = "<script>window.__STATE__ = " + "1" * 200_000 + "</script>"
+
+
+def test_small_prompt_is_sent_completely(monkeypatch, fake_model):
+    budget = use_budget(monkeypatch, 100_000, 1_000_000)
+    results = analyze(page(TILES))
+    assert len(results) == 1
+    assert len(fake_model.prompts) == 1
+    assert budget.usage_for(STEP)["strategie"] == "vollständig"
+
+
+def test_too_large_prompt_is_reduced(monkeypatch, fake_model):
+    budget = use_budget(monkeypatch, 20_000, 1_000_000)
+    analyze(page(BIG_SCRIPT + TILES))
+    assert len(fake_model.prompts) == 1
+    assert "window.__STATE__" not in fake_model.prompts[0]
+    assert budget.usage_for(STEP)["strategie"] == "reduziert"
+
+
+def test_reduced_prompt_still_too_large_is_chunked(monkeypatch, fake_model):
+    budget = use_budget(monkeypatch, 5_000, 1_000_000)
+    results = analyze(page(BIG_SCRIPT + TILES))
+    usage = budget.usage_for(STEP)
+    assert usage["strategie"] == "gechunkt"
+    assert usage["requests"] == len(fake_model.prompts) > 1
+    # Ergebnisse aller Teile werden zusammengeführt
+    assert len(results) == len(fake_model.prompts)
+    assert all(len(prompt) // CHARS_PER_TOKEN <= 5_000 for prompt in fake_model.prompts)
+
+
+def test_exhausted_run_budget_skips_step(monkeypatch, fake_model):
+    budget = use_budget(monkeypatch, 100_000, 1_000)
+    assert analyze(page(TILES)) == []
+    assert fake_model.prompts == []
+    assert budget.usage_for(STEP)["strategie"] == "übersprungen"
+    assert budget.skipped_steps()[0]["schritt"] == STEP
+    assert budget.used_tokens == 0
+
+
+def test_chunks_respect_step_limit_with_dense_tokenizer(monkeypatch):
+    model = DenseFakeModel()
+    monkeypatch.setattr(AI_Agent_FINAL, "GEMINI_MODEL", model)
+    budget = use_budget(monkeypatch, 5_000, 1_000_000)
+    analyze(page(BIG_SCRIPT + TILES))
+    assert budget.usage_for(STEP)["strategie"] == "gechunkt"
+    assert len(model.prompts) > 1
+    # Maßgeblich ist die Zählung des Modells, nicht die Schätzung mit 4 Zeichen pro Token
+    assert all(len(prompt) // 2 <= 5_000 for prompt in model.prompts)
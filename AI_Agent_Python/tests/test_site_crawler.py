@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+# site_crawler lädt beim Import Playwright und über AI_Agent_FINAL das Gemini-SDK
+for module in ("dotenv", "playwright.async_api", "google.generativeai", "pydantic"):
+    pytest.importorskip(module)
+
+import AI_Agent_FINAL
+import site_crawler
+from site_crawler import (
+    CHEAP_CHECKS_JS, FINGERPRINT_JS, SIMILARITY_THRESHOLD, TemplateCrawler, jaccard, normalize_url, url_pattern,
+)
+from token_budget import TokenBudget
+
+START_URL = "https://www.otto.de/"
+PRODUCT_LAYOUT = frozenset({"body/header", "body/main", "body/main/h1", "body/main/img", "body/footer"})
+
+
+def test_normalize_url_drops_query_and_fragment():
+    assert normalize_url("https://www.otto.de/p/artikel-1/?farbe=rot#bewertungen") == "https://www.otto.de/p/artikel-1/"
+    assert normalize_url("https://www.otto.de") == "https://www.otto.de/"
+
+
+@pytest.mark.parametrize("url, pattern", [
+    ("https://www.otto.de/", "/"),
+    ("https://www.otto.de/p/tom-tailor-jeans-C1473510499/", "/p/{id}"),
+    ("https://www.otto.de/damen/mode/kleider/", "/damen/*/*"),
+    ("https://www.otto.de/suche/t-shirt/", "/suche/*"),
+])
+def test_url_pattern(url, pattern):
+    assert url_pattern(url) == pattern
+
+
+def test_jaccard():
+    assert jaccard(frozenset(), frozenset()) == 1.0
+    assert jaccard(frozenset("ab"), frozenset("cd")) == 0.0
+    assert jaccard(frozenset("abc"), frozenset("abd")) == 0.5
+
+
+def test_assign_template_groups_similar_pages():
+    crawler = TemplateCrawler(START_URL)
+    first = crawler.assign_template("https://www.otto.de/p/artikel-1/", PRODUCT_LAYOUT)
+    # Ein zusätzliches Element: Ähnlichkeit 5/6 liegt über der Schwelle
+    similar = PRODUCT_LAYOUT | {"body/main/button"}
+    assert jaccard(PRODUCT_LAYOUT, similar) >= SIMILARITY_THRESHOLD
+    assert crawler.assign_template("https://www.otto.de/p/artikel-2/", similar) is first
+    assert first.urls == ["https://www.otto.de/p/artikel-1/", "https://www.otto.de/p/artikel-2/"]
+
+
+def test_assign_template_splits_by_similarity_and_pattern():
+    crawler = TemplateCrawler(START_URL)
+    product = crawler.assign_template("https://www.otto.de/p/artikel-1/", PRODUCT_LAYOUT)
+    # Gleiches URL-Muster, aber anderes Grundgerüst
+    other_layout = frozenset({"body/header", "body/main", "body/main/ul", "body/footer"})
+    assert jaccard(PRODUCT_LAYOUT, other_layout) < SIMILARITY_THRESHOLD
+    assert crawler.assign_template("https://www.otto.de/p/artikel-2/", other_layout) is not product
+    # Gleiches Grundgerüst, aber anderes URL-Muster
+    search = crawler.assign_template("https://www.otto.de/suche/jeans/", PRODUCT_LAYOUT)
+    assert search is not product and search.pattern == "/suche/*"
+    assert [t.template_id for t in crawler.templates] == [1, 2, 3]
+
+
+class FakePage:
+    """Liefert für jede Seite dasselbe Grundgerüst, ohne Browser."""
+
+    def __init__(self):
+        self.url = None
+
+    async def goto(self, url, wait_until=None):
+        self.url = url
+
+    async def evaluate(self, script):
+        if script == FINGERPRINT_JS:
+            return sorted(PRODUCT_LAYOUT)
+        if script == CHEAP_CHECKS_JS:
+            return {"image-alt": 0}
+        return []
+
+
+def test_page_counts_as_sampled_only_after_analysis(monkeypatch):
+    budget = TokenBudget(100_000, 1_000_000)
+    monkeypatch.setattr(AI_Agent_FINAL, "RUN_BUDGET", budget)
+
+    async def capture(page):
+        if page.url.endswith("/artikel-1/"):
+            raise RuntimeError("Seite geschlossen")
+        return "<html></html>"
+
+    async def analyze(html, url, step_description, history):
+        if url.endswith("/artikel-2/"):
+            budget.skip(step_description, 4000)
+            return []
+        budget.record(step_description, 1000, 50, 1.0, "vollständig")
+        return []
+
+    monkeypatch.setattr(site_crawler, "capture_page_html", capture)
+    monkeypatch.setattr(site_crawler, "analyze_with_gemini", analyze)
+
+    async def crawl():
+        crawler = TemplateCrawler(START_URL, samples_per_template=1)
+        crawler.request_delay = 0
+        page = FakePage()
+        for i in (1, 2, 3, 4):
+            try:
+                await crawler._visit(page, f"https://www.otto.de/p/artikel-{i}/")
+            except RuntimeError:
+                pass
+        return crawler
+
+    crawler = asyncio.run(crawl())
+    [template] = crawler.templates
+    # Seite 1 (Fehler) und 2 (Budget) geben den Platz wieder frei, Seite 3 belegt ihn
+    assert template.sampled == ["https://www.otto.de/p/artikel-3/"]
+    assert template.in_progress == 0
+    assert [result["url"] for result in template.llm_results] == ["https://www.otto.de/p/artikel-3/"]
+
+
+def test_report_extrapolates_saved_calls(monkeypatch):
+    budget = TokenBudget(100_000, 1_000_000)
+    monkeypatch.setattr(AI_Agent_FINAL, "RUN_BUDGET", budget)
+    crawler = TemplateCrawler(START_URL)
+    product = crawler.assign_template("https://www.otto.de/p/artikel-1/", PRODUCT_LAYOUT)
+    search = crawler.assign_template("https://www.otto.de/suche/jeans/", PRODUCT_LAYOUT)
+    product.sampled.append("https://www.otto.de/p/artikel-1/")
+    search.sampled.append("https://www.otto.de/suche/jeans/")
+    crawler.visited = 10
+    # Eine Seite in einem, eine gechunkt in zwei Requests; eine weitere wegen des Budgets übersprungen
+    budget.record("Template 1 (/p/{id}): https://www.otto.de/p/artikel-1/", 1000, 50, 1.0, "vollständig")
+    budget.record("Template 2 (/suche/*): https://www.otto.de/suche/jeans/", 1000, 50, 1.0, "gechunkt")
+    budget.record("Template 2 (/suche/*): https://www.otto.de/suche/jeans/", 1000, 50, 1.0, "gechunkt")
+    budget.skip("Template 2 (/suche/*): https://www.otto.de/suche/hemd/", 4000)
+
+    report = crawler.report()
+    assert report["seiten_mit_llm"] == 2
+    assert report["seiten_ohne_llm"] == 8
+    assert report["llm_aufrufe"] == 3
+    # 10 Seiten x 1,5 Aufrufe pro analysierter Seite
+    assert report["llm_aufrufe_erschoepfend"] == 15
+    assert report["llm_aufrufe_eingespart"] == 12
+    assert report["uebersprungene_schritte"] == [
+        {"schritt": "Template 2 (/suche/*): https://www.otto.de/suche/hemd/", "nicht_gesendete_tokens": 4000}
+    ]
+    assert report["template_details"][0]["mit_llm_analysiert"] == 1
+
+
+def test_report_without_llm_analysis(monkeypatch):
+    monkeypatch.setattr(AI_Agent_FINAL, "RUN_BUDGET", TokenBudget(100_000, 1_000_000))
+    crawler = TemplateCrawler(START_URL)
+    crawler.visited = 3
+    report = crawler.report()
+    assert report["llm_aufrufe_erschoepfend"] == 0 and report["llm_aufrufe_eingespart"] == 0
@@ -0,0 +1,181 @@
+import re
+import time
+
+# --- Token-Zählung und Budgets für die Gemini-Analyse ---
+# Vor jedem Request wird die Prompt-Größe bestimmt und gegen ein Budget pro Schritt
+# und pro Lauf geprüft. Ist ein Prompt zu groß, wird das HTML reduziert und notfalls
+# in mehrere Teile zerlegt, die einzeln analysiert werden.
+
+# Grobe Schätzung für HTML: ca. 4 Zeichen pro Token
+CHARS_PER_TOKEN = 4
+
+# Preise pro 1 Mio. Tokens in USD (gemini-2.5-flash, Stand Juli 2025)
+PRICE_PER_MILLION_INPUT = 0.30
+PRICE_PER_MILLION_OUTPUT = 2.50
+
+# (Input, Output) pro 1 Mio. Tokens je Modell, Stand Juli 2025. Für pro gilt der Preis
+# bis 200.000 Prompt-Tokens, darüber begrenzt MAX_TOKENS_PER_STEP die Prompts ohnehin.
+MODEL_PRICES = {
+    "gemini-2.5-flash": (PRICE_PER_MILLION_INPUT, PRICE_PER_MILLION_OUTPUT),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.S)
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style|noscript|template)\b[^>]*>.*?</\1\s*>", re.S | re.I)
+_SVG_RE = re.compile(r"(<svg\b[^>]*>).*?(</svg\s*>)", re.S | re.I)
+# Attribute ohne Bedeutung für die Barrierefreiheit (Tracking, Styles, Inline-Handler)
+_NOISE_ATTR_RE = re.compile(r'\s(?:style|on[a-z]+|data-(?!qa|id)[\w-]+)="[^"]*"', re.I)
+_WHITESPACE_RE = re.compile(r"\s{2,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Lokale Schätzung der Tokenanzahl ohne API-Aufruf."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+async def count_tokens(model, text: str) -> int:
+    """
+    Zählt die Tokens eines Prompts über den count_tokens-Endpunkt des SDK.
+    Ist das Modell None oder schlägt der Aufruf fehl, wird lokal geschätzt.
+    """
+    if model is None:
+        return estimate_tokens(text)
+    try:
+        result = await model.count_tokens_async([text])
+        return result.total_tokens
+    except Exception as e:
+        print(f"WARNUNG: Token-Zählung über die API fehlgeschlagen, nutze Schätzung: {e}")
+        return estimate_tokens(text)
+
+
+def reduce_html(page_html: str) -> str:
+    """
+    Entfernt Inhalte, die für die WCAG-Analyse keine Rolle spielen: Kommentare, Skripte,
+    Styles, SVG-Pfade, Tracking-/Style-Attribute und überflüssige Leerzeichen.
+    """
+    html = _COMMENT_RE.sub("", page_html)
+    html = _SCRIPT_STYLE_RE.sub("", html)
+    html = _SVG_RE.sub(r"\1\2", html)
+    html = _NOISE_ATTR_RE.sub("", html)
+    return _WHITESPACE_RE.sub(" ", html)
+
+
+def split_html(page_html: str, max_chars: int) -> list:
+    """Zerlegt HTML in Teile von höchstens max_chars Zeichen, bevorzugt an Tag-Grenzen."""
+    chunks = []
+    start = 0
+    while start < len(page_html):
+        end = min(start + max_chars, len(page_html))
+        if end < len(page_html):
+            boundary = page_html.rfind("<", start + max_chars // 2, end)
+            if boundary > start:
+                end = boundary
+        chunks.append(page_html[start:end])
+        start = end
+    return chunks
+
+
+def model_prices(model: str) -> tuple:
+    """(Input, Output)-Preis pro 1 Mio. Tokens für ein Modell aus MODEL_PRICES."""
+    if model not in MODEL_PRICES:
+        raise ValueError(f"Kein Preis für Modell '{model}' hinterlegt, bitte in MODEL_PRICES ergänzen.")
+    return MODEL_PRICES[model]
+
+
+def estimate_cost(prompt_tokens: int, output_tokens: int,
+                  price_input: float = PRICE_PER_MILLION_INPUT,
+                  price_output: float = PRICE_PER_MILLION_OUTPUT) -> float:
+    """Kosten eines Requests in USD (Preise pro 1 Mio. Tokens, Standard: gemini-2.5-flash)."""
+    return round(
+        prompt_tokens * price_input / 1_000_000
+        + output_tokens * price_output / 1_000_000,
+        6,
+    )
+
+
+class TokenBudget:
+    """
+    Budget für einen Lauf: maximale Prompt-Tokens pro Schritt, Tokens pro Lauf
+    und Laufzeit pro Lauf. Verbrauchte Werte werden pro Schritt protokolliert.
+    """
+
+    def __init__(self, max_tokens_per_step: int, max_tokens_per_run: int, max_seconds_per_run: float = None):
+        self.max_tokens_per_step = max_tokens_per_step
+        self.max_tokens_per_run = max_tokens_per_run
+        self.max_seconds_per_run = max_seconds_per_run
+        self.started = time.monotonic()
+        self.used_tokens = 0
+        self.used_cost = 0.0
+        self.records = {}
+
+    @property
+    def remaining_tokens(self) -> int:
+        return self.max_tokens_per_run - self.used_tokens
+
+    def fits_step(self, prompt_tokens: int) -> bool:
+        return prompt_tokens <= self.max_tokens_per_step
+
+    def allows(self, prompt_tokens: int) -> bool:
+        """Prüft, ob ein Request mit prompt_tokens noch in das Lauf-Budget (Tokens und Zeit) passt."""
+        if prompt_tokens > self.remaining_tokens:
+            return False
+        if self.max_seconds_per_run is not None and time.monotonic() - self.started > self.max_seconds_per_run:
+            return False
+        return True
+
+    def record(self, step_description: str, prompt_tokens: int, output_tokens: int,
+               seconds: float, strategy: str) -> dict:
+        """Verbucht einen Request und hängt ihn an die Einträge des Schritts an."""
+        cost = estimate_cost(prompt_tokens, output_tokens)
+        self.used_tokens += prompt_tokens + output_tokens
+        self.used_cost += cost
+        entry = self.records.setdefault(step_description, {
+            "strategie": strategy,
+            "requests": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "kosten_usd": 0.0,
+            "dauer_s": 0.0,
+        })
+        entry["strategie"] = strategy
+        entry["requests"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["output_tokens"] += output_tokens
+        entry["kosten_usd"] = round(entry["kosten_usd"] + cost, 6)
+        entry["dauer_s"] = round(entry["dauer_s"] + seconds, 2)
+        return entry
+
+    def skip(self, step_description: str, prompt_tokens: int) -> dict:
+        """Vermerkt einen Schritt, der wegen erschöpftem Budget nicht analysiert wurde."""
+        entry = self.records.setdefault(step_description, {
+            "strategie": "übersprungen",
+            "requests": 0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+            "kosten_usd": 0.0,
+            "dauer_s": 0.0,
+        })
+        entry["strategie"] = "übersprungen"
+        entry["nicht_gesendete_tokens"] = entry.get("nicht_gesendete_tokens", 0) + prompt_tokens
+        return entry
+
+    def skipped_steps(self) -> list:
+        """Schritte, deren Analyse (ganz oder teilweise) wegen erschöpftem Budget entfallen ist."""
+        return [
+            {"schritt": step, "nicht_gesendete_tokens": entry["nicht_gesendete_tokens"]}
+            for step, entry in self.records.items()
+            if entry.get("nicht_gesendete_tokens")
+        ]
+
+    def usage_for(self, step_description: str) -> dict:
+        return dict(self.records.get(step_description, {}))
+
+    def summary(self) -> dict:
+        return {
+            "tokens_verbraucht": self.used_tokens,
+            "tokens_budget": self.max_tokens_per_run,
+            "kosten_usd": round(self.used_cost, 6),
+            "dauer_s": round(time.monotonic() - self.started, 2),
+            "dauer_budget_s": self.max_seconds_per_run,
+        }
@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+from urllib.parse import urlsplit
+
+import httpx
+
+from html_cleaning import DEFAULT_PARSER, RAW_HTML_PARSER, clean_html_async
+from read_html_simple import BROWSER_HEADERS
+
+# tools/async_fetcher.py
+# Asynchroner HTML-Abruf für Seiten, die kein JavaScript brauchen:
+# - ein gemeinsamer httpx-Client mit Connection-Pool und HTTP Keep-Alive
+#   (TCP/TLS-Aufbau nur einmal pro Host)
+# - höchstens PER_HOST_LIMIT gleichzeitige Anfragen pro Host
+# - bedingte GETs (If-None-Match / If-Modified-Since) mit lokalem Cache, bei 304
+#   wird der Body nicht erneut übertragen
+# - gzip/deflate (und br/zstd, falls brotli/zstandard installiert) entpackt httpx transparent
+# Ist der Inhalt offensichtlich erst per JavaScript gerendert, wird automatisch auf
+# einen Headless-Browser zurückgefallen. Alle Fallbacks eines Fetchers teilen sich ein
+# Chromium mit höchstens BROWSER_PAGE_LIMIT gleichzeitig offenen Seiten.
+# Heuristik und Cache-Dateizugriffe laufen in Threads, damit die Event-Loop frei bleibt.
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache")
+MAX_CONNECTIONS = 20
+PER_HOST_LIMIT = 4
+TIMEOUT_SECONDS = 20
+BROWSER_PAGE_LIMIT = 2
+
+# Unterhalb dieser Menge sichtbaren Textes gilt eine Seite als JS-gerendert
+MIN_VISIBLE_TEXT_CHARS = 200
+_EMPTY_APP_ROOT_RE = re.compile(r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I)
+_NOSCRIPT_JS_RE = re.compile(r"<noscript[^>]*>[^<]*(?:JavaScript|JS)[^<]*</noscript>", re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def needs_javascript(html: str) -> bool:
+    """
+    Heuristik, ob das ausgelieferte HTML erst im Browser per JavaScript befüllt wird:
+    leere App-Container (React/Vue/Next), Noscript-Hinweise oder kaum sichtbarer Text.
+    """
+    if _EMPTY_APP_ROOT_RE.search(html):
+        return True
+    body = re.sub(r"<(script|style|noscript)\b.*?</\1\s*>", "", html, flags=re.S | re.I)
+    visible_text = _WHITESPACE_RE.sub(" ", _TAG_RE.sub(" ", body)).strip()
+    if len(visible_text) < MIN_VISIBLE_TEXT_CHARS:
+        return True
+    return bool(_NOSCRIPT_JS_RE.search(html)) and len(visible_text) < MIN_VISIBLE_TEXT_CHARS * 5
+
+
+class HttpCache:
+    """
+    Dateibasierter Cache für bedingte GETs: pro URL eine Metadaten-Datei (ETag,
+    Last-Modified) und eine Datei mit dem (entpackten) Body.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json"), os.path.join(self.cache_dir, key + ".html")
+
+    def get(self, url: str):
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, encoding="utf-8") as f:
+            meta["body"] = f.read()
+        return meta
+
+    def validators(self, url: str) -> dict:
+        """Header für den bedingten GET, falls die URL schon im Cache liegt."""
+        meta_path, _ = self._paths(url)
+        if not os.path.exists(meta_path):
+            return {}
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def put(self, url: str, response: httpx.Response) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return  # Ohne Validatoren ist kein bedingter GET möglich
+        meta_path, body_path = self._paths(url)
+        with open(body_path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f)
+
+
+class AsyncHtmlFetcher:
+    """
+    Ruft HTML-Seiten parallel über einen gemeinsamen Connection-Pool ab.
+
+    Beispiel:
+        async with AsyncHtmlFetcher() as fetcher:
+            results = await fetcher.fetch_many(urls)
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_connections: int = MAX_CONNECTIONS,
+                 per_host_limit: int = PER_HOST_LIMIT, browser_fallback: bool = True, clean: bool = True,
+                 browser_page_limit: int = BROWSER_PAGE_LIMIT):
+        self.cache = HttpCache(cache_dir) if cache_dir else None
+        self.per_host_limit = per_host_limit
+        self.browser_fallback = browser_fallback
+        self.clean = clean
+        self._host_semaphores = {}
+        self._browser_semaphore = asyncio.Semaphore(browser_page_limit)
+        self._browser_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._client = httpx.AsyncClient(
+            headers=BROWSER_HEADERS,
+            follow_redirects=True,
+            timeout=TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_semaphores[host]
+
+    async def _get(self, url: str) -> dict:
+        headers = await asyncio.to_thread(self.cache.validators, url) if self.cache else {}
+        async with self._semaphore(url):
+            response = await self._client.get(url, headers=headers)
+
+        if response.status_code == 304 and self.cache:
+            cached = await asyncio.to_thread(self.cache.get, url)
+            if cached is not None:
+                return {"url": url, "status": 304, "quelle": "cache", "html": cached["body"], "bytes": 0}
+            # Cache-Eintrag fehlt trotz 304: ohne Validatoren erneut laden
+            async with self._semaphore(url):
+                response = await self._client.get(url)
+
+        response.raise_for_status()
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, url, response)
+        return {
+            "url": url,
+            "status": response.status_code,
+            "quelle": "netz",
+            "html": response.text,
+            "bytes": response.num_bytes_downloaded,
+        }
+
+    async def fetch(self, url: str) -> dict:
+        """
+        Liefert {"url", "status", "quelle", "html", "bytes"}; "quelle" ist "netz", "cache", "browser"
+        oder "fehler". Im Fehlerfall enthält "html" wie bei read_html_from_url eine Fehlermeldung.
+        """
+        try:
+            result = await self._get(url)
+        except httpx.HTTPError as e:
+            return {"url": url, "status": None, "quelle": "fehler", "html": f"Fehler beim Abrufen der URL: {e}", "bytes": 0}
+
+        if self.browser_fallback and await asyncio.to_thread(needs_javascript, result["html"]):
+            print(f"{url} wird per JavaScript gerendert, nutze Headless-Browser...")
+            try:
+                html = await self._render(url)
+            except Exception as e:
+                return {"url": url, "status": result["status"], "quelle": "fehler",
+                        "html": f"Fehler beim Abrufen der URL mit Playwright: {e}", "bytes": result["bytes"]}
+            result.update({"quelle": "browser", "html": html})
+
+        if self.clean:
+            # lxml nur für das vom Browser serialisierte DOM, rohe Antworten wie read_html_from_url
+            parser = DEFAULT_PARSER if result["quelle"] == "browser" else RAW_HTML_PARSER
+            result["html"] = await clean_html_async(result["html"], parser)
+        return result
+
+    async def _get_browser(self):
+        async with self._browser_lock:
+            if self._browser is None:
+                # Import erst hier: Playwright wird nur für JS-gerenderte Seiten gebraucht
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=True)
+            return self._browser
+
+    async def _render(self, url: str) -> str:
+        """Rendert die Seite im gemeinsamen Browser und liefert das HTML nach dem JavaScript."""
+        async with self._browser_semaphore:
+            browser = await self._get_browser()
+            page = await browser.new_page()
+            try:
+                await page.goto(url, wait_until="networkidle")
+                return await page.content()
+            finally:
+                await page.close()
+
+    async def fetch_many(self, urls: list) -> list:
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    async def close(self) -> None:
+        await self._client.aclose()
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+            self._browser = self._playwright = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def read_html_from_url_async(url: str) -> str:
+    """Asynchrones Gegenstück zu read_html_from_url für einzelne Seiten."""
+    async with AsyncHtmlFetcher() as fetcher:
+        return (await fetcher.fetch(url))["html"]
+
+
+#print(asyncio.run(read_html_from_url_async("https://www.otto.de/")))
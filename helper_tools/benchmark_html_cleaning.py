@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import glob
+import time
+import asyncio
+import argparse
+
+from html_cleaning import DEFAULT_PARSER, HtmlCleaningExecutor, clean_html
+
+# tools/benchmark_html_cleaning.py
+# Micro-Benchmark für die HTML-Bereinigung:
+#   1. Parse-Durchsatz von 'html.parser' (bisher) und lxml (neu) im selben Prozess
+#   2. Stillstand der Event-Loop, während alle Seiten mit demselben Parser bereinigt
+#      werden: direkt in der Event-Loop (bisher) vs. über den Prozess-Pool (neu)
+#   3. Anteil der Seiten, bei denen beide Parser exakt dasselbe Ergebnis liefern
+#
+# Aufruf:
+#   python benchmark_html_cleaning.py --pages ../pages
+# Ohne --pages werden Dokumente aus den HTML-Ausschnitten der gespeicherten
+# axe-Berichte in Axe_devTools_Java_Script/results/ zusammengesetzt.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AXE_RESULTS_GLOB = os.path.join(REPO_ROOT, "Axe_devTools_Java_Script", "results", "*.json")
+TICK_SECONDS = 0.005
+
+
+def load_pages(pages_dir: str = None) -> list:
+    """Lädt gespeicherte HTML-Seiten oder baut pro Berichtsschritt ein Dokument aus den axe-Ausschnitten."""
+    if pages_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                pages.append(f.read())
+        return pages
+
+    pages = []
+    for path in sorted(glob.glob(AXE_RESULTS_GLOB)):
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+        for step in report:
+            snippets = [node["html"] for violation in step.get("violations", []) for node in violation.get("nodes", [])]
+            if snippets:
+                pages.append(
+                    "<!DOCTYPE html>\n<html lang=\"de\"><head><title>"
+                    + step.get("description", "")
+                    + "</title></head><body>\n"
+                    + "\n".join(snippets)
+                    + "\n</body></html>\n"
+                )
+    return pages
+
+
+def measure_throughput(pages: list, parser: str) -> dict:
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages)
+    started = time.perf_counter()
+    for page in pages:
+        clean_html(page, parser)
+    duration = time.perf_counter() - started
+    return {
+        "parser": parser,
+        "seiten_pro_s": round(len(pages) / duration, 1),
+        "mb_pro_s": round(total_bytes / duration / 1_000_000, 2),
+        "dauer_s": round(duration, 3),
+    }
+
+
+async def _ticker(stalls: list, stop: asyncio.Event) -> None:
+    # Misst, wie viel später als geplant die Event-Loop wieder zum Zug kommt
+    while not stop.is_set():
+        planned = time.perf_counter() + TICK_SECONDS
+        await asyncio.sleep(TICK_SECONDS)
+        stalls.append(max(0.0, time.perf_counter() - planned))
+
+
+async def _measure_stall(clean_all) -> dict:
+    stalls = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(stalls, stop))
+    await asyncio.sleep(TICK_SECONDS * 2)
+    started = time.perf_counter()
+    await clean_all()
+    duration = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return {
+        "dauer_s": round(duration, 3),
+        "max_stillstand_ms": round(max(stalls, default=0.0) * 1000, 1),
+        "summe_stillstand_ms": round(sum(stalls) * 1000, 1),
+    }
+
+
+async def measure_event_loop_stall(pages: list, parser: str) -> dict:
+    # Beide Varianten mit demselben Parser, damit nur der Effekt des Pools gemessen wird
+    async def inline():
+        for page in pages:
+            clean_html(page, parser)
+            await asyncio.sleep(0)
+
+    async def pooled(executor):
+        await asyncio.gather(*(executor.clean(page) for page in pages))
+
+    inline_result = await _measure_stall(inline)
+    with HtmlCleaningExecutor(parser=parser) as executor:
+        # Pool vorwärmen, damit der Prozessstart nicht mitgemessen wird
+        await executor.clean(pages[0])
+        pooled_result = await _measure_stall(lambda: pooled(executor))
+    return {f"{parser} in der Event-Loop": inline_result, f"{parser} im Prozess-Pool": pooled_result}
+
+
+def compare_outputs(pages: list, parser: str) -> dict:
+    identical = sum(1 for page in pages if clean_html(page, "html.parser") == clean_html(page, parser))
+    return {"seiten": len(pages), "identisch": identical}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark der HTML-Bereinigung")
+    arg_parser.add_argument("--pages", help="Verzeichnis mit gespeicherten *.html-Seiten")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Wie oft der Korpus durchlaufen wird")
+    args = arg_parser.parse_args()
+
+    corpus = load_pages(args.pages)
+    if not corpus:
+        sys.exit("Keine Seiten gefunden.")
+    pages = corpus * args.repeat
+    print(f"{len(corpus)} Seiten x {args.repeat} Durchläufe, schneller Parser: {DEFAULT_PARSER}")
+
+    results = {
+        "durchsatz": [measure_throughput(pages, "html.parser"), measure_throughput(pages, DEFAULT_PARSER)],
+        "event_loop": [
+            asyncio.run(measure_event_loop_stall(pages, "html.parser")),
+            asyncio.run(measure_event_loop_stall(pages, DEFAULT_PARSER)),
+        ],
+        "ausgabe_vergleich": compare_outputs(corpus, DEFAULT_PARSER),
+    }
+    print(json.dumps(results, indent=4, ensure_ascii=False))
@@ -0,0 +1,215 @@
+import asyncio
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# tools/html_cleaning.py
+# Bereinigung von HTML (Skript- und Style-Tags entfernen) außerhalb der Event-Loop.
+# Das Parsen ist reine CPU-Arbeit und blockiert sonst die Event-Loop, die alle Browser
+# steuert. Deshalb läuft es in einem Prozess-Pool, standardmäßig mit lxml statt mit dem
+# langsamen 'html.parser'. Die Ausgabe wird im Format von str(soup) serialisiert, damit
+# Prompts und Berichte gleich bleiben.
+#
+# Die Gleichheit mit html.parser gilt nur für vom Browser serialisiertes HTML
+# (page.content()): vollständige Dokumente mit allen End-Tags. Rohes HTML aus
+# HTTP-Antworten lässt oft optionale End-Tags weg (<li>, <p>, </head>); lxml ergänzt
+# sie nach HTML-Regeln, html.parser verschachtelt stattdessen. Rohe Antworten
+# werden deshalb weiter mit RAW_HTML_PARSER bereinigt.
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+    DEFAULT_PARSER = "lxml"
+except ImportError:  # lxml nicht installiert: auf BeautifulSoup zurückfallen
+    HAS_LXML = False
+    DEFAULT_PARSER = "html.parser"
+
+# Für rohe HTTP-Antworten (read_html_simple, async_fetcher ohne Browser)
+RAW_HTML_PARSER = "html.parser"
+
+REMOVED_TAGS = ("script", "style")
+
+# Wie BeautifulSoup: leere Void-Elemente werden als <br/> ausgegeben
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+    "link", "menuitem", "meta", "param", "source", "track", "wbr",
+    "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer",
+}
+# Attribute, die BeautifulSoup als Wortliste behandelt (Leerraum wird normalisiert)
+MULTI_VALUED_ATTRIBUTES = {
+    "*": {"class", "accesskey", "dropzone"},
+    "a": {"rel", "rev"},
+    "link": {"rel", "rev"},
+    "td": {"headers"},
+    "th": {"headers"},
+    "form": {"accept-charset"},
+    "object": {"archive"},
+    "area": {"rel"},
+    "icon": {"sizes"},
+    "iframe": {"sandbox"},
+    "output": {"for"},
+}
+# Boolesche Attribute ohne Wert liefert lxml als name="name", BeautifulSoup als name=""
+BOOLEAN_ATTRIBUTES = {
+    "allowfullscreen", "async", "autofocus", "autoplay", "checked", "controls", "default",
+    "defer", "disabled", "formnovalidate", "hidden", "inert", "ismap", "itemscope", "loop",
+    "multiple", "muted", "nomodule", "novalidate", "open", "playsinline", "readonly",
+    "required", "reversed", "selected",
+}
+# Reiner Leerraum außerhalb dieser Tags wird von bs4 auf "\n" bzw. " " verkürzt
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+_NON_WHITESPACE_RE = re.compile(r"\S+")
+_PROLOG_RE = re.compile(r"(\s*)(?:<!doctype([^>]*)>(\s*))?", re.I)
+_EPILOG_RE = re.compile(r"</html\s*>(\s*)$", re.I)
+
+
+def _escape_text(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _text(text: str, preserve: bool) -> str:
+    if not preserve and not text.strip(_ASCII_SPACES):
+        return "\n" if "\n" in text else " "
+    return _escape_text(text)
+
+
+def _quote_attribute(value: str) -> str:
+    # Gleiche Regel wie bs4 (Formatter "minimal")
+    value = _escape_text(value)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', "&quot;") + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def _serialize(element, out: list, preserve: bool = False) -> None:
+    tag = element.tag
+    if tag is etree.Comment:
+        out.append(f"<!--{element.text or ''}-->")
+    elif isinstance(tag, str):
+        tag = tag.lower()
+        multi_valued = MULTI_VALUED_ATTRIBUTES["*"] | MULTI_VALUED_ATTRIBUTES.get(tag, set())
+        attrs = []
+        # bs4 gibt Attribute alphabetisch sortiert aus
+        for name, value in sorted((name.lower(), value) for name, value in element.attrib.items()):
+            if name in multi_valued:
+                value = " ".join(_NON_WHITESPACE_RE.findall(value))
+            elif name in BOOLEAN_ATTRIBUTES and value == name:
+                value = ""
+            attrs.append(f" {name}={_quote_attribute(value)}")
+        attrs = "".join(attrs)
+        if tag in VOID_ELEMENTS and not element.text and len(element) == 0:
+            out.append(f"<{tag}{attrs}/>")
+        else:
+            out.append(f"<{tag}{attrs}>")
+            inner_preserve = preserve or tag in PRESERVE_WHITESPACE_TAGS
+            if element.text:
+                out.append(_text(element.text, inner_preserve))
+            for child in element:
+                _serialize(child, out, inner_preserve)
+            out.append(f"</{tag}>")
+    # Processing Instructions und Entities tauchen in HTML-Seiten nicht auf
+    if element.tail:
+        out.append(_text(element.tail, preserve))
+
+
+def _clean_with_lxml(html: str) -> str:
+    try:
+        return _serialize_with_lxml(html)
+    except (etree.ParserError, ValueError, RecursionError) as e:
+        # Leere Dokumente (ParserError), Strings mit XML-Encoding-Deklaration (ValueError)
+        # und sehr tief verschachtelte DOMs (RecursionError) kann nur bs4 verarbeiten
+        print(f"lxml konnte das HTML nicht verarbeiten ({type(e).__name__}: {e}), nutze html.parser.")
+        return _clean_with_bs4(html, "html.parser")
+
+
+def _serialize_with_lxml(html: str) -> str:
+    root = lxml.html.document_fromstring(html)
+    # with_tail=False: Text nach dem entfernten Tag bleibt erhalten (wie extract() in bs4)
+    etree.strip_elements(root, *REMOVED_TAGS, with_tail=False)
+    # Doctype und Leerraum außerhalb von <html> verwirft bzw. ergänzt lxml,
+    # bs4 übernimmt sie aus dem Quelltext
+    prolog = _PROLOG_RE.match(html)
+    out = []
+    if prolog.group(1):
+        out.append(_text(prolog.group(1), False))
+    if prolog.group(2) is not None:
+        # bs4 schreibt nach dem Doctype immer einen Zeilenumbruch
+        out.append(f"<!DOCTYPE{prolog.group(2)}>\n")
+        if prolog.group(3):
+            out.append(_text(prolog.group(3), False))
+    _serialize(root, out)
+    epilog = _EPILOG_RE.search(html)
+    if epilog and epilog.group(1):
+        out.append(_text(epilog.group(1), False))
+    return "".join(out)
+
+
+def _clean_with_bs4(html: str, parser: str) -> str:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, parser)
+    for script in soup(list(REMOVED_TAGS)):
+        script.extract()
+    return str(soup)
+
+
+def clean_html(html: str, parser: str = DEFAULT_PARSER) -> str:
+    """
+    Entfernt Skript- und Style-Tags und gibt das HTML im Format von str(soup) zurück.
+
+    Args:
+        html (str): Das HTML der Seite.
+        parser (str): "lxml" (schnell) oder ein BeautifulSoup-Parser wie "html.parser" (Referenz).
+    Returns:
+        str: Das bereinigte HTML.
+    """
+    if parser == "lxml":
+        if not HAS_LXML:
+            raise ImportError("Parser 'lxml' angefordert, aber lxml ist nicht installiert (pip install lxml).")
+        return _clean_with_lxml(html)
+    return _clean_with_bs4(html, parser)
+
+
+class HtmlCleaningExecutor:
+    """
+    Führt clean_html in einem Prozess-Pool aus, damit die Event-Loop nicht blockiert.
+    Kann mit "async with" oder "with" verwendet werden; eine Instanz wird am besten
+    für den ganzen Lauf geteilt, damit die Worker-Prozesse nur einmal starten.
+    """
+
+    def __init__(self, max_workers: int = None, parser: str = DEFAULT_PARSER):
+        self.parser = parser
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    async def clean(self, html: str, parser: str = None) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, clean_html, html, parser or self.parser)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+_default_executor = None
+
+
+async def clean_html_async(html: str, parser: str = None) -> str:
+    """clean_html über einen gemeinsamen Prozess-Pool, der beim ersten Aufruf gestartet wird."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = HtmlCleaningExecutor()
+    return await _default_executor.clean(html, parser)
@@ -3,7 +3,7 @@
 # tools/web_reader_tool.py
 # Wichtig: Nutze jetzt die async_api
 from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+from html_cleaning import clean_html_async
 
 async def read_dynamic_html_from_url(url: str) -> str:
     """
@@ -26,12 +26,8 @@ async def read_dynamic_html_from_url(url: str) -> str:
 
             html_content = await page.content() # Auch hier 'await'
 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # Skript- und Style-Tags entfernen
-            for script in soup(["script", "style"]):
-                script.extract()
-
-            return str(soup)
+            # Skript- und Style-Tags entfernen (im Prozess-Pool, blockiert die Event-Loop nicht)
+            return await clean_html_async(html_content)
     except Exception as e:
         # Erfasse hier spezifischere Playwright-Fehler, falls nötig
         return f"Fehler beim Abrufen der URL mit Playwright: {e}"
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Die Module in helper_tools werden als Skripte nebeneinander importiert
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+import os
+import asyncio
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("requests")  # BROWSER_HEADERS aus read_html_simple
+
+from async_fetcher import AsyncHtmlFetcher, needs_javascript
+
+URL = "https://www.otto.de/service/impressum/"
+STATIC_PAGE = "<html><head><title>Impressum</title></head><body><main>" + "Otto GmbH & Co KG, Hamburg. " * 20 + "</main></body></html>"
+APP_SHELL = '<html><head><script src="/app.js"></script></head><body><div id="root"></div></body></html>'
+
+
+def run_with_fetcher(tmp_path, handler, test, **kwargs):
+    """Führt test(fetcher) mit einem Fetcher aus, dessen Client Anfragen an handler statt ins Netz schickt."""
+    kwargs.setdefault("clean", False)
+
+    async def run():
+        fetcher = AsyncHtmlFetcher(cache_dir=str(tmp_path / "cache"), **kwargs)
+        await fetcher._client.aclose()
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await test(fetcher)
+        finally:
+            await fetcher.close()
+
+    return asyncio.run(run())
+
+
+def etag_server(requests):
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"'})
+        return httpx.Response(200, headers={"ETag": '"v1"'}, text=STATIC_PAGE)
+    return handler
+
+
+def test_etag_round_trip_serves_cache(tmp_path):
+    requests = []
+
+    async def test(fetcher):
+        return await fetcher.fetch(URL), await fetcher.fetch(URL)
+
+    first, second = run_with_fetcher(tmp_path, etag_server(requests), test, browser_fallback=False)
+    assert first["quelle"] == "netz" and first["status"] == 200
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == '"v1"'
+    assert second["quelle"] == "cache" and second["status"] == 304 and second["bytes"] == 0
+    assert second["html"] == STATIC_PAGE
+
+
+def test_304_without_cached_body_refetches(tmp_path):
+    requests = []
+
+    async def test(fetcher):
+        await fetcher.fetch(URL)
+        # Metadaten (ETag) vorhanden, Body verloren
+        for name in os.listdir(fetcher.cache.cache_dir):
+            if name.endswith(".html"):
+                os.remove(os.path.join(fetcher.cache.cache_dir, name))
+        return await fetcher.fetch(URL)
+
+    result = run_with_fetcher(tmp_path, etag_server(requests), test, browser_fallback=False)
+    assert [r.headers.get("If-None-Match") for r in requests] == [None, '"v1"', None]
+    assert result["quelle"] == "netz" and result["status"] == 200 and result["html"] == STATIC_PAGE
+
+
+def test_per_host_limit(tmp_path):
+    active, peak = {}, {}
+
+    async def handler(request):
+        host = request.url.host
+        active[host] = active.get(host, 0) + 1
+        peak[host] = max(peak.get(host, 0), active[host])
+        await asyncio.sleep(0.02)
+        active[host] -= 1
+        return httpx.Response(200, text=STATIC_PAGE)
+
+    async def test(fetcher):
+        urls = [f"https://{host}/seite-{i}/" for host in ("www.otto.de", "www.zalando.de") for i in range(6)]
+        return await fetcher.fetch_many(urls)
+
+    results = run_with_fetcher(tmp_path, handler, test, per_host_limit=2, browser_fallback=False)
+    assert len(results) == 12
+    assert peak == {"www.otto.de": 2, "www.zalando.de": 2}
+
+
+def test_needs_javascript():
+    assert needs_javascript(APP_SHELL)
+    assert not needs_javascript(STATIC_PAGE)
+
+
+def test_fetch_reports_browser_errors(tmp_path):
+    def handler(request):
+        return httpx.Response(200, text=APP_SHELL)
+
+    async def failing_render(url):
+        raise RuntimeError("Chromium nicht installiert")
+
+    async def test(fetcher):
+        fetcher._render = failing_render
+        return await fetcher.fetch(URL)
+
+    result = run_with_fetcher(tmp_path, handler, test)
+    assert result["quelle"] == "fehler" and result["status"] == 200
+    assert "Chromium nicht installiert" in result["html"]
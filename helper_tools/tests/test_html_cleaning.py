@@ -0,0 +1,69 @@
+import pytest
+
+import html_cleaning
+from html_cleaning import RAW_HTML_PARSER, clean_html
+
+pytest.importorskip("bs4")
+
+PAGE = '<!DOCTYPE html>\n<html lang="de"><head><script>x()</script></head><body><p class=" a  b ">T</p></body></html>'
+
+
+def test_lxml_matches_html_parser():
+    pytest.importorskip("lxml")
+    assert clean_html(PAGE, "lxml") == clean_html(PAGE, "html.parser")
+
+
+# Optionale End-Tags, wie sie in rohen HTTP-Antworten vorkommen, und dieselben
+# Dokumente so, wie der Browser sie serialisiert (page.content())
+RAW_OPTIONAL_END_TAGS = [
+    "<html><body><ul><li>a<li>b</ul></body></html>",
+    "<html><body><p>a<p>b</body></html>",
+    "<html><head><title>t</title><body>x</body></html>",
+]
+SERIALIZED_OPTIONAL_END_TAGS = [
+    "<html><head></head><body><ul><li>a</li><li>b</li></ul></body></html>",
+    "<html><head></head><body><p>a</p><p>b</p></body></html>",
+    "<html><head><title>t</title></head><body>x</body></html>",
+]
+
+
+@pytest.mark.parametrize("html", SERIALIZED_OPTIONAL_END_TAGS)
+def test_lxml_matches_html_parser_on_serialized_dom(html):
+    pytest.importorskip("lxml")
+    assert clean_html(html, "lxml") == clean_html(html, "html.parser")
+
+
+@pytest.mark.parametrize("html", RAW_OPTIONAL_END_TAGS)
+def test_raw_html_keeps_html_parser_output(html):
+    # Rohe Antworten werden nicht mit lxml bereinigt: html.parser verschachtelt
+    # fehlende End-Tags anders, als lxml sie ergänzt
+    from bs4 import BeautifulSoup
+
+    assert RAW_HTML_PARSER == "html.parser"
+    assert clean_html(html, RAW_HTML_PARSER) == str(BeautifulSoup(html, "html.parser"))
+
+
+@pytest.mark.parametrize("html", [
+    "",
+    "  \n ",
+    '<?xml version="1.0" encoding="utf-8"?><html><body>x<script>y()</script></body></html>',
+])
+def test_lxml_falls_back_to_html_parser(html):
+    pytest.importorskip("lxml")
+    assert clean_html(html, "lxml") == clean_html(html, "html.parser")
+
+
+def test_lxml_falls_back_on_deep_dom(monkeypatch):
+    pytest.importorskip("lxml")
+
+    def too_deep(*args, **kwargs):
+        raise RecursionError("maximum recursion depth exceeded")
+
+    monkeypatch.setattr(html_cleaning, "_serialize", too_deep)
+    assert clean_html(PAGE, "lxml") == clean_html(PAGE, "html.parser")
+
+
+def test_lxml_without_lxml_installed(monkeypatch):
+    monkeypatch.setattr(html_cleaning, "HAS_LXML", False)
+    with pytest.raises(ImportError, match="lxml"):
+        clean_html(PAGE, "lxml")